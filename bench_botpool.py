@@ -0,0 +1,61 @@
+"""推送机器人分片压测: 一致性哈希 对比 取模分片
+
+统计各机器人分到的目标数 (越均匀越好) 以及增删一个机器人时换了机器人的目标比例
+(一致性哈希约 1/N，取模分片接近全部)。
+用法: python bench_botpool.py [目标数] [机器人数]
+"""
+import statistics
+import sys
+import time
+from core.botpool import HashRing, _hash
+
+
+def modulo(nodes):
+    nodes = sorted(nodes)
+    return lambda key: nodes[_hash(str(key)) % len(nodes)]
+
+
+def ring(nodes):
+    return HashRing(nodes).node_for
+
+
+def assign(route, targets):
+    return {t: route(t) for t in targets}
+
+
+def moved(before, after):
+    return sum(1 for t, n in before.items() if after[t] != n) / len(before)
+
+
+def spread(mapping, nodes):
+    counts = [0] * len(nodes)
+    index = {n: i for i, n in enumerate(nodes)}
+    for n in mapping.values(): counts[index[n]] += 1
+    mean = len(mapping) / len(nodes)
+    return max(counts) / mean, statistics.pstdev(counts) / mean
+
+
+def main():
+    n_targets = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_bots = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    # 私聊与群组混合的目标
+    targets = [10_000_000 + i if i % 5 else -1_000_000_000_000 - i for i in range(n_targets)]
+    nodes = [str(6_000_000_000 + i) for i in range(n_bots + 1)]
+    base, grown, shrunk = nodes[:n_bots], nodes, nodes[1:n_bots]
+
+    print(f"目标 {n_targets} 个，机器人 {n_bots} 个 (增加到 {n_bots + 1} 个 / 减少到 {n_bots - 1} 个)")
+    print(f"{'':<10} {'最大负载/均值':>12} {'负载离散度':>10} {'增加后移动':>10} {'减少后移动':>10} {'查找 us':>8}")
+    for name, make in (("取模", modulo), ("一致性哈希", ring)):
+        route = make(base)
+        t0 = time.perf_counter()
+        before = assign(route, targets)
+        lookup = (time.perf_counter() - t0) / n_targets * 1e6
+        peak, cv = spread(before, base)
+        up = moved(before, assign(make(grown), targets))
+        down = moved(before, assign(make(shrunk), targets))
+        print(f"{name:<10} {peak:>12.3f} {cv:>10.3f} {up:>10.1%} {down:>10.1%} {lookup:>8.2f}")
+    print(f"理想移动比例: 增加 {1 / (n_bots + 1):.1%}，减少 {1 / n_bots:.1%}")
+
+
+if __name__ == "__main__":
+    main()
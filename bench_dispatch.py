@@ -0,0 +1,91 @@
+"""推送调度压测: 逐条 await 发送 (旧版) 对比 Dispatcher，后端为本地模拟的 Bot API
+
+模拟的 Bot API 按 Telegram 的限制返回 RetryAfter: 全局每秒 30 条，同一私聊 3 秒内最多 3 条，
+同一群组每分钟 20 条；每次请求有 latency 秒的网络延迟。
+旧版遇到 RetryAfter 只记日志不重试，计为丢失。
+用法: python bench_dispatch.py [推送条数] [目标数]
+"""
+import asyncio
+import random
+import sys
+import time
+from collections import deque
+from aiogram.exceptions import TelegramRetryAfter
+from core.dispatch import Dispatcher
+
+
+class FakeBotAPI:
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.global_log = deque()
+        self.chat_log = {}
+        self.delivered = 0
+        self.rejected = 0
+
+    def _over(self, log, now, window, limit):
+        while log and now - log[0] >= window: log.popleft()
+        return len(log) >= limit
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        log = self.chat_log.setdefault(chat_id, deque())
+        window, limit = (60, 20) if chat_id < 0 else (3, 3)
+        if self._over(self.global_log, now, 1, 30) or self._over(log, now, window, limit):
+            self.rejected += 1
+            raise TelegramRetryAfter(method=None, message="Too Many Requests", retry_after=1 if chat_id > 0 else 3)
+        self.global_log.append(now)
+        log.append(now)
+        self.delivered += 1
+
+
+def gen_burst(n, n_targets, rng):
+    # 两成目标为群组 (notify_target_id 指向群)，命中集中在少数热门订阅者
+    targets = [-(1_000_000 + i) if i % 5 == 0 else 10_000 + i for i in range(n_targets)]
+    return [rng.choice(targets[: max(1, n_targets // 10)]) if rng.random() < 0.3 else rng.choice(targets) for _ in range(n)]
+
+
+async def run_inline(burst):
+    api = FakeBotAPI()
+    t0 = time.perf_counter()
+    lost = 0
+    for chat_id in burst:
+        try:
+            await api.send_message(chat_id=chat_id, text="x")
+        except TelegramRetryAfter:
+            lost += 1
+    return api, lost, time.perf_counter() - t0
+
+
+async def run_dispatcher(burst):
+    api = FakeBotAPI()
+    d = Dispatcher(api.send_message)
+    runner = asyncio.create_task(d.run())
+    t0 = time.perf_counter()
+    for chat_id in burst: d.submit(chat_id, text="x")
+    t_submit = time.perf_counter() - t0
+    left = await d.drain(timeout=600)
+    elapsed = time.perf_counter() - t0
+    runner.cancel()
+    return api, d, left, t_submit, elapsed
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    n_targets = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    burst = gen_burst(n, n_targets, random.Random(42))
+
+    api, lost, elapsed = await run_inline(burst)
+    print(f"推送 {n} 条，目标 {n_targets} 个")
+    print(f"{'逐条发送':<10} 送达 {api.delivered:>5}  丢失 {lost:>5}  429 {api.rejected:>5}  "
+          f"耗时 {elapsed:6.1f}s  吞吐 {api.delivered / elapsed:5.1f}/s  匹配流程阻塞 {elapsed:6.1f}s")
+
+    api, d, left, t_submit, elapsed = await run_dispatcher(burst)
+    stats = d.stats()
+    print(f"{'Dispatcher':<10} 送达 {api.delivered:>5}  丢失 {left + stats['failed'] + stats['dropped']:>5}  429 {api.rejected:>5}  "
+          f"耗时 {elapsed:6.1f}s  吞吐 {api.delivered / elapsed:5.1f}/s  匹配流程阻塞 {t_submit * 1000:6.1f}ms")
+    print(f"{'':<10} 平均延迟 {stats['latency_avg']}s  最大延迟 {stats['latency_max']}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""推送渲染压测: 旧版逐订阅者拼键盘 对比 NotifyRenderer
+
+旧版每个订阅者都重新创建按钮与 InlineKeyboardMarkup、每条消息用 datetime 计算北京时间；
+新版正文与键盘每条消息只生成一次，订阅者之间共用。
+渲染结果全部保留 (相当于排在推送队列里)，用 tracemalloc 统计每条推送新分配的内存块与字节数。
+用法: python bench_render.py [消息条数] [每条消息的订阅者数]
+"""
+import datetime
+import gc
+import sys
+import time
+import tracemalloc
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from core.render import NotifyRenderer
+
+ADS = [[InlineKeyboardButton(text=f"广告{i}{j}", url=f"https://t.me/ad{i}{j}") for j in range(2)] for i in range(2)]
+
+
+def gen_messages(n):
+    return [{
+        "user_id": 10_000 + i, "user_name": f"用户{i}", "username": f"@user{i}", "title": f"群组{i % 50}",
+        "link": f"https://t.me/group{i % 50}/{i}", "content": f"出售 二手 设备 编号{i} " * 5,
+    } for i in range(n)]
+
+
+def render_inline(msgs, n_subs):
+    out = []
+    for m in msgs:
+        now_str = (datetime.datetime.utcnow() + datetime.timedelta(hours=8)).strftime("%Y-%m-%d %H:%M:%S")
+        body = (
+            f"用户ID：<code>{m['user_id']}</code>\n"
+            f"用户昵称：{m['user_name']}\n"
+            f"用户名：{m['username']}\n"
+            f"来自于：<a href='{m['link']}'>{m['title']}</a>\n"
+            f"用户历史搜索：无\n"
+            f"捕捉时间：{now_str}\n"
+            f"发送内容：{m['content']}"
+        )
+        for s in range(n_subs):
+            hit_tags = " ".join(f"#{kw}" for kw in ("出售", "设备"))
+            text = f"<b>监听关键词</b>\n🎯 <b>命中关键词：</b>{hit_tags}\n\n{body}"
+            user_kb_list = [] if s % 3 == 0 else ADS + []
+            fixed_btns = [
+                [InlineKeyboardButton(text="🧐 消息定位 🧐", url=m['link'])],
+                [InlineKeyboardButton(text="❌ 关闭", callback_data="menu_monitor"),
+                 InlineKeyboardButton(text="🔊 拉黑ID", callback_data=f"ban_target:{m['user_id']}")],
+            ]
+            out.append((text, InlineKeyboardMarkup(inline_keyboard=user_kb_list + fixed_btns)))
+    return out
+
+
+def render_compiled(msgs, n_subs, renderer):
+    out = []
+    for m in msgs:
+        view = renderer.message(m["user_id"], m["user_name"], m["username"], m["title"], m["link"], "无", m["content"], m["content"])
+        for s in range(n_subs):
+            out.append((view.text(("出售", "设备")), view.keyboard(s % 3 == 0)))
+    return out
+
+
+def measure(fn, *args):
+    gc.collect()
+    t0 = time.perf_counter()
+    out = fn(*args)
+    elapsed = time.perf_counter() - t0
+    del out
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    out = fn(*args)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    blocks = sum(d.count_diff for d in diff)
+    size = sum(d.size_diff for d in diff)
+    return len(out), elapsed, blocks, size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_subs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    msgs = gen_messages(n)
+    renderer = NotifyRenderer(ADS)
+    print(f"消息 {n} 条，每条 {n_subs} 个订阅者")
+    for name, fn, args in (("逐个拼接", render_inline, (msgs, n_subs)), ("预编译", render_compiled, (msgs, n_subs, renderer))):
+        pushes, elapsed, blocks, size = measure(fn, *args)
+        print(f"{name:<8} {elapsed / pushes * 1e6:8.1f} us/条  内存块 {blocks / pushes:6.1f} 个/条  {size / pushes:8.0f} B/条")
+
+
+if __name__ == "__main__":
+    main()
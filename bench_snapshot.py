@@ -0,0 +1,86 @@
+"""配置快照压测: 全量重建 (订阅者表 + 匹配引擎 + 过滤词索引) 对比从快照冷启动
+
+数据库查询耗时不计入，全量重建的实际耗时还要加上一次 keywords/users 联表查询。
+用法: python bench_snapshot.py [关键词行数] [用户数]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from core.matcher import MatchEngine, OwnedMatcher
+from core.normalize import DEFAULT_NORMALIZER
+from core.snapshot import dump_config, load_config
+from core.subscribers import SubscriberTable
+
+CHARSET = [chr(c) for c in range(0x4e00, 0x4e00 + 3000)]
+
+
+def gen_rows(n_rows, n_users, rng):
+    rows = []
+    for _ in range(n_rows):
+        uid = rng.randint(1, n_users)
+        rows.append({
+            'word': "".join(rng.choice(CHARSET) for _ in range(rng.randint(2, 4))), 'match_mode': 'fuzzy',
+            'user_db_id': uid, 'tg_id': 10_000_000 + uid, 'is_paused': False, 'notify_simple_mode': False,
+            'notify_target_id': None, 'fuzzy_limit': 0, 'ai_filter_enabled': uid % 2 == 0, 'notify_digest_window': 0, 'expire_ts': None,
+            # 约一成的关键词限定了群组范围
+            'include_chats': [f"-100{rng.randint(1, 500)}"] if uid % 10 == 0 else None,
+            'exclude_chats': [f"-100{rng.randint(1, 500)}"] if uid % 10 == 1 else None,
+        })
+    return rows
+
+
+def build(rows, filters):
+    """与 worker.load_settings 相同的构建步骤"""
+    table = SubscriberTable()
+    for r in rows:
+        table.add_keyword(table.upsert(r), r['word'], r['match_mode'], r['include_chats'], r['exclude_chats'])
+    engine = MatchEngine(list(table.keywords), DEFAULT_NORMALIZER)
+    owners = {}
+    for uid, words in filters.items():
+        for w in words: owners.setdefault(DEFAULT_NORMALIZER.word(w), set()).add(uid)
+    return table, engine, OwnedMatcher(owners)
+
+
+def scan_all(engine, msgs):
+    start = time.perf_counter()
+    for m in msgs: engine.scan(m)
+    return time.perf_counter() - start
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_users = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    rng = random.Random(42)
+    rows = gen_rows(n_rows, n_users, rng)
+    filters = {10_000_000 + u: ["".join(rng.choice(CHARSET) for _ in range(2))] for u in range(1, n_users, 4)}
+    msgs = ["".join(rng.choice(CHARSET) for _ in range(rng.randint(20, 200))) for _ in range(2000)]
+
+    t0 = time.perf_counter()
+    table, engine, filter_index = build(rows, filters)
+    t_build = time.perf_counter() - t0
+
+    path = os.path.join(tempfile.mkdtemp(), "worker_config.snap")
+    t0 = time.perf_counter()
+    dump_config(path, table, filters, engine, filter_index, DEFAULT_NORMALIZER)
+    t_dump = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    _, _, loaded, _, _ = load_config(path, DEFAULT_NORMALIZER)
+    t_load = time.perf_counter() - t0
+
+    # 快照加载的自动机按需展开，前几批消息会稍慢
+    t_cold = scan_all(loaded, msgs)
+    t_warm = scan_all(loaded, msgs)
+    t_built = scan_all(engine, msgs)
+
+    print(f"关键词行数 {n_rows}，用户 {n_users}，快照 {os.path.getsize(path) / 1e6:.1f} MB")
+    print(f"{'全量重建':<12} {t_build * 1000:>10.0f} ms")
+    print(f"{'写入快照':<12} {t_dump * 1000:>10.0f} ms")
+    print(f"{'快照冷启动':<12} {t_load * 1000:>10.0f} ms")
+    print(f"{'扫描 2000 条':<12} 重建 {t_built * 1000:.0f} ms / 快照首轮 {t_cold * 1000:.0f} ms / 快照次轮 {t_warm * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""订阅者配置内存压测: 旧版 (关键词 -> [dict]) 对比 SubscriberTable
+
+用法: python bench_subscribers.py [关键词行数] [用户数]
+"""
+import random
+import sys
+import time
+import tracemalloc
+from core.subscribers import SubscriberTable
+
+CHARSET = [chr(c) for c in range(0x4e00, 0x4e00 + 3000)]
+
+
+def gen_rows(n_rows, n_users, rng):
+    # 热门词 + 长尾词混合，模拟大量用户订阅同一批词
+    hot = ["".join(rng.choice(CHARSET) for _ in range(2)) for _ in range(200)]
+    rows = []
+    for i in range(n_rows):
+        uid = rng.randint(1, n_users)
+        word = rng.choice(hot) if rng.random() < 0.5 else "".join(rng.choice(CHARSET) for _ in range(rng.randint(2, 4)))
+        rows.append({
+            'word': word, 'user_db_id': uid, 'tg_id': 10_000_000 + uid,
+            'is_paused': False, 'notify_simple_mode': uid % 3 == 0, 'notify_target_id': None,
+            'fuzzy_limit': 0, 'ai_filter_enabled': uid % 2 == 0, 'notify_digest_window': 0, 'expire_ts': None,
+        })
+    return rows
+
+
+def build_dicts(rows):
+    """旧版 load_settings 的结构与去重方式"""
+    new_kw = {}
+    for r in rows:
+        word = r['word']
+        user_config = {
+            'uid': r['tg_id'],
+            'paused': r['is_paused'],
+            'simple': r['notify_simple_mode'],
+            'target': r['notify_target_id'],
+            'limit': r['fuzzy_limit'],
+            'ai': r['ai_filter_enabled']
+        }
+        if word not in new_kw: new_kw[word] = []
+        exists = False
+        for u in new_kw[word]:
+            if u['uid'] == user_config['uid']:
+                exists = True
+                break
+        if not exists:
+            new_kw[word].append(user_config)
+    return new_kw
+
+
+def build_table(rows):
+    table = SubscriberTable()
+    for r in rows:
+        table.add_keyword(table.upsert(r), r['word'])
+    return table
+
+
+def measure(fn, rows):
+    # 行数据在开始追踪前已生成，只统计结构本身新分配的内存
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn(rows)
+    elapsed = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current, peak
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_users = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    rows = gen_rows(n_rows, n_users, random.Random(42))
+    print(f"{n_rows} 行关键词, {n_users} 用户")
+    print(f"{'结构':<16} {'构建(s)':>10} {'常驻(MB)':>10} {'峰值(MB)':>10}")
+    for name, fn in (("dict 列表", build_dicts), ("SubscriberTable", build_table)):
+        _, elapsed, current, peak = measure(fn, rows)
+        print(f"{name:<16} {elapsed:>10.2f} {current / 1e6:>10.1f} {peak / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
+import html
 import math
 from typing import Union
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
 from bot.states import MonitorStates
+from core.chatscope import parse_scope
 from core.database import db
+from core.normalize import DEFAULT_NORMALIZER
+from core.rules import compile_rule, looks_like_rule
 
 router = Router()
 PAGE_SIZE = 10
@@ -114,7 +118,9 @@ async def start_add_keyword(callback: types.CallbackQuery, state: FSMContext):
     text = (
         "[30s] tips：每个关键词通过逗号分隔可以实现批量添加关键词\n"
         "例如：<code>监听, 会员, 能量</code> (点击复制)\n"
-        "如需模糊匹配，则可以用 <code>?</code> 替代模糊位置，如：<code>谁?卖?号</code>\n\n"
+        "如需模糊匹配，则可以用 <code>?</code> 替代模糊位置，如：<code>谁?卖?号</code>\n"
+        "组合规则 (运算符大写)：<code>USDT AND 出售 NOT 回收</code>、<code>USDT NEAR/10 出售</code>\n"
+        "指定群组：<code>出售 in:@群用户名</code> 只在该群监听，<code>出售 ex:-100123456</code> 排除该群\n\n"
         "👉 <b>请输入需要监听的关键词：</b>\n"
         "<i>(或点击下方快捷按钮)</i>"
     )
@@ -138,6 +144,9 @@ async def process_keyword_input(message: types.Message, state: FSMContext):
 
     user_tg_id = message.from_user.id
     added_count = 0
+    scoped_count = 0
+    rule_words = []
+    raw_words = []
     fail_reason = ""
     
     async with db.pg_pool.acquire() as conn:
@@ -145,17 +154,48 @@ async def process_keyword_input(message: types.Message, state: FSMContext):
         current_count = await conn.fetchval("SELECT COUNT(*) FROM keywords WHERE user_id = $1", user['id'])
         limit = 80 if user['role'] == 'vip' else 5
         
-        for kw in keywords:
+        for item in keywords:
+            try:
+                kw, include, exclude = parse_scope(item)
+            except ValueError as e:
+                fail_reason = f"⚠️ <code>{html.escape(item)}</code> 无效：{e}"
+                continue
+            if not kw: continue
+            include, exclude = include or None, exclude or None
+            exists = await conn.fetchval("SELECT id FROM keywords WHERE user_id = $1 AND word = $2", user['id'], kw)
+            # 已有的关键词再次输入并带上群组时，只更新其范围
+            if exists:
+                if include or exclude:
+                    await conn.execute("UPDATE keywords SET include_chats = $1, exclude_chats = $2 WHERE id = $3", include, exclude, exists)
+                    scoped_count += 1
+                continue
             if current_count >= limit:
                 fail_reason = f"⚠️ 达到配额上限 ({limit}个)，请升级会员！"
                 break
-            exists = await conn.fetchval("SELECT id FROM keywords WHERE user_id = $1 AND word = $2", user['id'], kw)
-            if not exists:
-                await conn.execute("INSERT INTO keywords (user_id, word) VALUES ($1, $2)", user['id'], kw)
-                added_count += 1
-                current_count += 1
+            # 组合规则 (如 USDT AND 出售 NOT 回收，运算符须大写) 以 rule 模式保存
+            mode = 'fuzzy'
+            if looks_like_rule(kw):
+                try:
+                    compile_rule(kw, DEFAULT_NORMALIZER.strict_word)
+                except ValueError as e:
+                    fail_reason = f"⚠️ 规则 <code>{html.escape(kw)}</code> 无效：{e}"
+                    continue
+                mode = 'rule'
+                rule_words.append(kw)
+            elif DEFAULT_NORMALIZER.lossy(kw):
+                # 如 C++ 去掉符号后只剩 c，这类词按原文匹配
+                raw_words.append(kw)
+            await conn.execute(
+                "INSERT INTO keywords (user_id, word, match_mode, include_chats, exclude_chats) VALUES ($1, $2, $3, $4, $5)",
+                user['id'], kw, mode, include, exclude
+            )
+            added_count += 1
+            current_count += 1
 
     msg = f"✅ <b>成功添加了 {added_count} 个关键词</b>"
+    if scoped_count: msg += f"\n📍 更新了 {scoped_count} 个关键词的群组范围"
+    if raw_words: msg += "\n🔤 以下含有符号或过短，将按原文匹配 (不忽略符号与空格)：\n" + "\n".join(f"<code>{html.escape(w)}</code>" for w in raw_words)
+    if rule_words: msg += "\n🧩 以下按组合规则保存 (大写的 AND / OR / NOT / NEAR 为运算符)：\n" + "\n".join(f"<code>{html.escape(w)}</code>" for w in rule_words)
     if fail_reason: msg += f"\n\n{fail_reason}"
         
     await message.answer(msg, parse_mode="HTML", reply_markup=ReplyKeyboardRemove())
@@ -174,7 +214,7 @@ async def render_keyword_list(message: types.Message, tg_id: int, page: int, is_
         offset = (page - 1) * PAGE_SIZE
         total_count = await conn.fetchval("SELECT COUNT(*) FROM keywords WHERE user_id = $1", user_db_id)
         total_pages = math.ceil(total_count / PAGE_SIZE) if total_count > 0 else 1
-        rows = await conn.fetch("SELECT id, word FROM keywords WHERE user_id = $1 ORDER BY id DESC LIMIT $2 OFFSET $3", user_db_id, PAGE_SIZE, offset)
+        rows = await conn.fetch("SELECT id, word, include_chats, exclude_chats FROM keywords WHERE user_id = $1 ORDER BY id DESC LIMIT $2 OFFSET $3", user_db_id, PAGE_SIZE, offset)
 
     redis_key = f"sel_kw:{tg_id}"
     selected_ids = set()
@@ -186,6 +226,7 @@ async def render_keyword_list(message: types.Message, tg_id: int, page: int, is_
     for row in rows:
         kid = str(row['id'])
         word = row['word']
+        if row['include_chats'] or row['exclude_chats']: word = f"📍{word}"
         is_sel = kid in selected_ids
         btn_text = f"✅ {word}" if is_sel else word
         curr.append(InlineKeyboardButton(text=btn_text, callback_data=f"kw_tog:{kid}:{page}"))
@@ -3,6 +3,8 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardRemove
 from bot.states import MonitorStates
 from core.database import db
+from core.normalize import DEFAULT_NORMALIZER
+import html
 import math
 
 router = Router()
@@ -106,6 +108,9 @@ async def process_filter_input(message: types.Message, state: FSMContext):
         return
 
     count = 0
+    # 过滤词按规范化后的形式匹配，去掉符号后变空或只剩一个字的 (如 C++ 变成 c) 会误拦大量消息，不予添加
+    rejected = [w for w in words if DEFAULT_NORMALIZER.lossy(w)]
+    words = [w for w in words if w not in rejected]
     if db.pg_pool:
         async with db.pg_pool.acquire() as conn:
             user_id = await conn.fetchval("SELECT id FROM users WHERE tg_id = $1", message.from_user.id)
@@ -115,7 +120,9 @@ async def process_filter_input(message: types.Message, state: FSMContext):
                     await conn.execute("INSERT INTO filter_words (user_id, word) VALUES ($1, $2)", user_id, w)
                     count += 1
     
-    await message.answer(f"✅ 成功添加了 {count} 个过滤词！", reply_markup=ReplyKeyboardRemove())
+    msg = f"✅ 成功添加了 {count} 个过滤词！"
+    if rejected: msg += "\n\n⚠️ 以下过滤词去掉符号后为空或过短，未添加：\n" + "\n".join(f"<code>{html.escape(w)}</code>" for w in rejected)
+    await message.answer(msg, parse_mode="HTML", reply_markup=ReplyKeyboardRemove())
     await state.clear()
     
     # 跳转到查看列表
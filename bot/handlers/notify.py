@@ -7,6 +7,12 @@ from core.database import db
 
 router = Router()
 PAGE_SIZE = 5
+# 合并推送可选窗口 (秒)，0 为逐条推送；按钮依次切换
+DIGEST_WINDOWS = (0, 60, 300, 900)
+
+def digest_label(window):
+    if not window: return "关闭 (逐条推送)"
+    return f"每 {window // 60} 分钟合并" if window % 60 == 0 else f"每 {window} 秒合并"
 
 # ==================================================================
 # 1. 通知控制面板
@@ -31,6 +37,7 @@ async def show_notify_panel(event: Union[types.CallbackQuery, types.Message]):
     target_name = user['notify_target_name']
     target_id = user['notify_target_id']
     is_vip = user['role'] == 'vip'
+    digest_window = user['notify_digest_window'] or 0
     
     status_icon = "⏸ 已暂停" if is_paused else "✅ 已开启"
     mode_icon = "🔕 精简模式" if is_simple else "🔔 普通模式"
@@ -60,7 +67,8 @@ async def show_notify_panel(event: Union[types.CallbackQuery, types.Message]):
         "------------------\n"
         f"🎯 监听通知：<b>{status_icon}</b>\n"
         f"📢 通知目标：<b>{target_display}</b>\n"
-        f"🔊 通知模式：<b>{mode_icon}</b>"
+        f"🔊 通知模式：<b>{mode_icon}</b>\n"
+        f"📦 合并推送：<b>{digest_label(digest_window)}</b>"
         f"{adv_text}"
     )
     
@@ -75,6 +83,9 @@ async def show_notify_panel(event: Union[types.CallbackQuery, types.Message]):
             InlineKeyboardButton(text="🚫 黑名单管理", callback_data="blacklist_view:1"),
             InlineKeyboardButton(text="🔕 精简/去广告", callback_data="notify_toggle_simple")
         ],
+        [
+            InlineKeyboardButton(text="📦 合并推送", callback_data="notify_cycle_digest")
+        ],
         [
             InlineKeyboardButton(text="🔙 返回主菜单", callback_data="menu_back")
         ]
@@ -111,6 +122,17 @@ async def toggle_simple(callback: types.CallbackQuery):
         await conn.execute("UPDATE users SET notify_simple_mode = NOT notify_simple_mode WHERE tg_id = $1", callback.from_user.id)
     await show_notify_panel(callback)
 
+@router.callback_query(F.data == "notify_cycle_digest")
+async def cycle_digest(callback: types.CallbackQuery):
+    """在可选窗口间切换；命中很多的订阅者开启后，同一目标在窗口内的命中合并成一条消息"""
+    user_id = callback.from_user.id
+    async with db.pg_pool.acquire() as conn:
+        current = await conn.fetchval("SELECT notify_digest_window FROM users WHERE tg_id = $1", user_id) or 0
+        nxt = DIGEST_WINDOWS[(DIGEST_WINDOWS.index(current) + 1) % len(DIGEST_WINDOWS)] if current in DIGEST_WINDOWS else 0
+        await conn.execute("UPDATE users SET notify_digest_window = $1 WHERE tg_id = $2", nxt, user_id)
+    await callback.answer(f"📦 合并推送：{digest_label(nxt)}")
+    await show_notify_panel(callback)
+
 # ==================================================================
 # 3. 更改目标 - 向导 (🟢 修复链接生成逻辑)
 # ==================================================================
@@ -267,7 +289,8 @@ async def unban_user(callback: types.CallbackQuery):
     await callback.answer("✅ 已解封")
     await view_blacklist(callback)
 
-@router.callback_query(F.data.startswith("ban_target:"))
+# 旧版推送消息上的按钮为 ban:<id>
+@router.callback_query(F.data.startswith("ban_target:") | F.data.startswith("ban:"))
 async def add_to_blacklist(callback: types.CallbackQuery):
     blocked_tg_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
@@ -0,0 +1,69 @@
+import time
+from collections import OrderedDict
+
+
+class MediaGroup:
+    __slots__ = ("key", "deadline", "messages", "contents")
+
+    def __init__(self, key, deadline):
+        self.key = key
+        self.deadline = deadline
+        self.messages = []
+        self.contents = []  # 各条的文字/说明，去重后按到达顺序保存
+
+    @property
+    def message(self):
+        """代表整组的消息: 相册的第一条 (消息链接指向它)"""
+        return min(self.messages, key=lambda m: m.id)
+
+    @property
+    def content(self):
+        return "\n".join(self.contents)
+
+
+class MediaGroupBuffer:
+    """相册合并缓冲: media_group_id 相同的多条消息攒 window 秒后作为一条处理
+
+    截止时间从组内第一条到达时算起、不再顺延，因此各组按创建顺序到期，
+    用插入有序的字典即可，到期检查只看最前面的组。最多同时缓冲 maxsize 组，
+    超出时最旧的一组提前交出。不属于相册的消息不经过这里，延迟不受影响。
+    """
+
+    def __init__(self, window=1.0, maxsize=1000):
+        self.window = window
+        self.maxsize = maxsize
+        self._groups = OrderedDict()  # (chat_id, media_group_id) -> MediaGroup
+        self.merged = 0  # 被合并掉的条数
+
+    def __len__(self):
+        return len(self._groups)
+
+    def add(self, key, message, content, now=None):
+        """加入一条相册消息，返回因容量不足需要立即处理的组列表"""
+        now = time.monotonic() if now is None else now
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = MediaGroup(key, now + self.window)
+        else:
+            self.merged += 1
+        group.messages.append(message)
+        if content not in group.contents: group.contents.append(content)
+        out = []
+        while len(self._groups) > self.maxsize: out.append(self._groups.popitem(last=False)[1])
+        return out
+
+    def due(self, now=None):
+        """取出所有已到期的组"""
+        now = time.monotonic() if now is None else now
+        groups = self._groups
+        out = []
+        while groups:
+            group = next(iter(groups.values()))
+            if group.deadline > now: break
+            out.append(groups.popitem(last=False)[1])
+        return out
+
+    def drain(self):
+        out = list(self._groups.values())
+        self._groups.clear()
+        return out
@@ -0,0 +1,33 @@
+class Blacklist:
+    """订阅者拉黑的发送者 (user_blacklist)
+
+    by_user: 订阅者 tg_id -> {被拉黑的 tg_id}，用于校验和与整体替换；
+    blocked_by: 被拉黑的 tg_id -> {订阅者 tg_id}，推送前按发送者查一次即可得到全部需要排除的订阅者。
+    """
+
+    def __init__(self):
+        self.by_user = {}
+        self.blocked_by = {}
+
+    def __len__(self):
+        return sum(len(s) for s in self.by_user.values())
+
+    def add(self, uid, sender_id):
+        self.by_user.setdefault(uid, set()).add(sender_id)
+        self.blocked_by.setdefault(sender_id, set()).add(uid)
+
+    def discard(self, uid, sender_id):
+        blocked = self.by_user.get(uid)
+        if blocked is None or sender_id not in blocked: return
+        blocked.discard(sender_id)
+        if not blocked: del self.by_user[uid]
+        owners = self.blocked_by[sender_id]
+        owners.discard(uid)
+        if not owners: del self.blocked_by[sender_id]
+
+    def remove_user(self, uid):
+        for sender_id in list(self.by_user.get(uid, ())): self.discard(uid, sender_id)
+
+    def blockers(self, sender_id):
+        """拉黑了该发送者的订阅者集合 (不要修改返回值)"""
+        return self.blocked_by.get(sender_id, ())
@@ -0,0 +1,151 @@
+import asyncio
+import bisect
+import functools
+import hashlib
+import logging
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest
+from core.dispatch import Dispatcher, GLOBAL_RATE
+
+logger = logging.getLogger(__name__)
+
+MAX_PINNED = 100000  # 改走主机器人的目标数上限，超出后整体清空重新探测
+PIN_KEY = "botpool:pinned"  # Redis 哈希: 推送目标 -> 机器人，worker 与 dispatcher 进程共用
+
+
+def _hash(s):
+    return int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big")
+
+
+def bot_id(token):
+    """token 冒号前的数字即机器人 id，作为环上的节点名 (稳定且不暴露 token)"""
+    return token.split(":", 1)[0]
+
+
+class HashRing:
+    """一致性哈希环: 每个节点在环上放 vnodes 个虚拟点，键归属顺时针方向的第一个点
+
+    增加一个节点只会从各节点手里拿走落在新点区间内的键 (约 1/N)，删除节点只影响它自己的键，
+    其余键的归属不变。
+    """
+
+    def __init__(self, nodes=(), vnodes=1000):
+        self.vnodes = vnodes
+        self._nodes = set()
+        self._points = []  # 排好序的虚拟点哈希值
+        self._owners = []  # 与 _points 对应的节点
+        for node in nodes: self.add(node)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def _rebuild(self):
+        ring = sorted((_hash(f"{node}#{i}"), node) for node in self._nodes for i in range(self.vnodes))
+        self._points = [h for h, _ in ring]
+        self._owners = [node for _, node in ring]
+
+    def add(self, node):
+        if node in self._nodes: return
+        self._nodes.add(node)
+        self._rebuild()
+
+    def remove(self, node):
+        if node not in self._nodes: return
+        self._nodes.discard(node)
+        self._rebuild()
+
+    def node_for(self, key):
+        if not self._points: raise LookupError("哈希环为空")
+        i = bisect.bisect(self._points, _hash(str(key)))
+        return self._owners[i if i < len(self._points) else 0]
+
+
+class BotPool:
+    """多个推送机器人: 按推送目标一致性哈希分片，每个机器人一个 Dispatcher (各自的全局与单目标限速)
+
+    同一目标总由同一个机器人发送，接收者看到的发送者固定；增删 token 时只有约 1/N 的目标换机器人。
+    第一个 token 为主机器人 (用户 /start 的那个)。目标没有启动或拉入分配到的机器人时 (Forbidden /
+    chat not found)，改由主机器人重发，之后固定走主机器人。设置了 redis 时这些目标同时写入 Redis 哈希，
+    启动时 load_pins() 载入，重启后与其它进程不必再各失败一次。
+    与 Dispatcher 接口相同 (submit / run / drain / prune / stats)，worker 与 dispatcher.py 直接替换使用。
+    """
+
+    def __init__(self, tokens, rate=GLOBAL_RATE, make_bot=Bot, vnodes=1000, redis=None, pin_key=PIN_KEY, **dispatcher_opts):
+        if not tokens: raise ValueError("至少需要一个机器人 token")
+        self.bots = {}
+        self.dispatchers = {}
+        for token in tokens:
+            name = bot_id(token)
+            if name in self.bots: continue
+            bot = self.bots[name] = make_bot(token=token)
+            self.dispatchers[name] = Dispatcher(bot.send_message, rate=rate, **dispatcher_opts)
+        self.primary = bot_id(tokens[0])
+        self.ring = HashRing(self.dispatchers, vnodes)
+        self._pinned = {}  # 目标 -> 机器人，分配到的机器人无法发送时改走主机器人
+        self.redis = redis
+        self.pin_key = pin_key
+        self.fallbacks = 0
+
+    def __len__(self):
+        return sum(len(d) for d in self.dispatchers.values())
+
+    def route(self, chat_id):
+        name = self._pinned.get(chat_id)
+        return self.ring.node_for(chat_id) if name is None else name
+
+    def submit(self, chat_id, on_sent=None, on_failed=None, **kwargs):
+        name = self.route(chat_id)
+        if name != self.primary:
+            on_failed = functools.partial(self._fallback, chat_id, on_sent, on_failed, kwargs)
+        return self.dispatchers[name].submit(chat_id, on_sent=on_sent, on_failed=on_failed, **kwargs)
+
+    async def load_pins(self):
+        """从 Redis 载入改走主机器人的目标 (其它进程或上次运行记下的)，返回载入数量"""
+        if self.redis is None or len(self.dispatchers) == 1: return 0
+        pins = await self.redis.hgetall(self.pin_key)
+        for chat_id, name in pins.items():
+            # 已经不在池里的机器人忽略，按哈希环重新分配
+            if name in self.dispatchers: self._pinned[int(chat_id)] = name
+        return len(self._pinned)
+
+    async def _save_pin(self, chat_id, reset):
+        if self.redis is None: return
+        try:
+            if reset: await self.redis.delete(self.pin_key)
+            await self.redis.hset(self.pin_key, str(chat_id), self.primary)
+        except Exception as e:
+            logger.warning(f"⚠️ 主机器人目标写入 Redis 失败: {e}")
+
+    async def _fallback(self, chat_id, on_sent, on_failed, kwargs, error):
+        unreachable = isinstance(error, TelegramForbiddenError) or (
+            isinstance(error, TelegramBadRequest) and "chat not found" in str(error).lower())
+        if unreachable:
+            reset = len(self._pinned) >= MAX_PINNED
+            if reset: self._pinned.clear()
+            self._pinned[chat_id] = self.primary
+            self.fallbacks += 1
+            logger.info(f"推送目标 {chat_id} 未接入分配的机器人，改由主机器人发送")
+            ok = self.dispatchers[self.primary].submit(chat_id, on_sent=on_sent, on_failed=on_failed, **kwargs)
+            # 先重新排队再写 Redis，不让这次推送多等一个往返
+            await self._save_pin(chat_id, reset)
+            if ok: return
+        if on_failed is not None: await on_failed(error)
+
+    async def run(self):
+        await asyncio.gather(*(d.run() for d in self.dispatchers.values()))
+
+    def prune(self):
+        for d in self.dispatchers.values(): d.prune()
+
+    async def drain(self, timeout=10):
+        left = await asyncio.gather(*(d.drain(timeout) for d in self.dispatchers.values()))
+        return sum(left)
+
+    async def close(self):
+        for bot in self.bots.values(): await bot.session.close()
+
+    def stats(self):
+        per_bot = {name: d.stats() for name, d in self.dispatchers.items()}
+        total = {k: sum(s[k] for s in per_bot.values()) for k in ("pending", "targets", "sent", "dropped", "overflow", "failed", "retried", "retry_after")}
+        if len(per_bot) == 1: return dict(next(iter(per_bot.values())), fallbacks=self.fallbacks)
+        return dict(total, fallbacks=self.fallbacks, pinned=len(self._pinned), bots=per_bot)
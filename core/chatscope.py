@@ -0,0 +1,40 @@
+import re
+
+# ==================================================================
+# 关键词的群组范围 (keywords.include_chats / keywords.exclude_chats)
+# ==================================================================
+# 用户在关键词后面追加 in:群 / ex:群，群可以是 chat_id (-100...) 或 @用户名，例如:
+#   出售 USDT in:@usdt_otc in:-1001234567890
+#   能量 ex:@spam_group
+# 只有 in: 时只在列出的群里生效；ex: 排除指定的群；两者都没有时全网生效。
+
+MAX_SCOPE_CHATS = 50
+_SCOPE_TOKEN = re.compile(r"(?:^|\s)(in|ex):(\S+)", re.IGNORECASE)
+
+
+def chat_ref(value):
+    """群组引用的规范形式: chat_id 的十进制字符串，或小写的 @用户名；无法识别返回 None"""
+    value = str(value).strip()
+    if re.fullmatch(r"-?\d+", value): return str(int(value))
+    name = value.rsplit("/", 1)[-1].lstrip("@")  # 也接受 t.me/xxx 链接
+    if re.fullmatch(r"[A-Za-z][A-Za-z0-9_]{3,}", name): return "@" + name.lower()
+    return None
+
+
+def message_chat_refs(chat):
+    """一条消息所在群的全部引用形式"""
+    if chat.username: return (str(chat.id), "@" + chat.username.lower())
+    return (str(chat.id),)
+
+
+def parse_scope(text):
+    """拆出关键词文本里的 in:/ex: 标记，返回 (关键词, 包含列表, 排除列表)；格式错误抛出 ValueError"""
+    include, exclude = [], []
+    for kind, value in _SCOPE_TOKEN.findall(text):
+        ref = chat_ref(value)
+        if ref is None: raise ValueError(f"无法识别的群组: {value}")
+        target = include if kind.lower() == "in" else exclude
+        if ref not in target: target.append(ref)
+    if len(include) + len(exclude) > MAX_SCOPE_CHATS: raise ValueError(f"每个关键词最多指定 {MAX_SCOPE_CHATS} 个群")
+    word = _SCOPE_TOKEN.sub("", text).strip()
+    return word, include, exclude
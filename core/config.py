@@ -9,12 +9,57 @@ class Config:
     
     # Bot
     BOT_TOKEN = os.getenv("BOT_TOKEN")
+    # 推送机器人池: 逗号分隔的额外 token，与 BOT_TOKEN 一起按推送目标一致性哈希分担推送，每个机器人各自限速。
+    # 接收者需先启动 (群组需拉入) 分配到的机器人，否则改由 BOT_TOKEN 发送；留空表示只用 BOT_TOKEN
+    DELIVERY_BOT_TOKENS = [t.strip() for t in os.getenv("DELIVERY_BOT_TOKENS", "").split(",") if t.strip()]
     ADMIN_ID = int(os.getenv("ADMIN_ID", 0))
     
     # Client (Userbot) - 🟢 关键补全
     API_ID = os.getenv("API_ID")
     API_HASH = os.getenv("API_HASH")
     
+    # 关键词匹配: 繁简对照表文件 (可选，默认只用内置常用字表)
+    T2S_TABLE_PATH = os.getenv("T2S_TABLE_PATH")
+    
+    # Worker: 多进程部署时通过 Redis 做跨进程消息去重
+    DEDUP_REDIS = os.getenv("DEDUP_REDIS", "0") == "1"
+    
+    # Worker: 近似重复内容在该窗口 (秒) 内对同一订阅者只推送一次，0 表示关闭
+    NEARDUP_WINDOW = int(os.getenv("NEARDUP_WINDOW", 600))
+    
+    # Worker: 关键词命中率统计窗口 (秒)；命中率超过 HOTWORD_THROTTLE_RATIO 的关键词
+    # 改为摘要推送 (每 DIGEST_WINDOW 秒合并一条)，0 表示不限流
+    HOTWORD_WINDOW = int(os.getenv("HOTWORD_WINDOW", 600))
+    HOTWORD_THROTTLE_RATIO = float(os.getenv("HOTWORD_THROTTLE_RATIO", 0))
+    HOTWORD_MIN_HITS = int(os.getenv("HOTWORD_MIN_HITS", 50))
+    DIGEST_WINDOW = int(os.getenv("DIGEST_WINDOW", 300))
+    
+    # Worker: 发送者信誉 (每分钟发言数/跨群数/广告评分/被拉黑人数)；每分钟超过 DEMOTE_RATE 条改为摘要推送，
+    # 超过 DROP_RATE 条直接丢弃，REPUTATION_DEMOTE_RATE=0 (默认) 表示关闭；REPUTATION_REDIS=1 时多个 worker 共享丢弃名单
+    REPUTATION_DEMOTE_RATE = int(os.getenv("REPUTATION_DEMOTE_RATE", 0))
+    REPUTATION_DROP_RATE = int(os.getenv("REPUTATION_DROP_RATE", 30))
+    REPUTATION_MAX_CHATS = int(os.getenv("REPUTATION_MAX_CHATS", 20))
+    REPUTATION_REPORTS = int(os.getenv("REPUTATION_REPORTS", 3))
+    REPUTATION_REDIS = os.getenv("REPUTATION_REDIS", "0") == "1"
+    
+    # Worker: 单群刷屏保护，每个群每秒 FLOOD_CHAT_RATE 条、可突发 FLOOD_CHAT_BURST 条，超出后逐级降级
+    # (只做匹配 -> 采样 -> 暂时静默)，流量回落后自动恢复；0 (默认) 表示关闭
+    # 正常的活跃大群可达每秒 10 条以上，开启时 RATE 应高于平时峰值，只拦截真正的刷屏
+    FLOOD_CHAT_RATE = float(os.getenv("FLOOD_CHAT_RATE", 0))
+    FLOOD_CHAT_BURST = int(os.getenv("FLOOD_CHAT_BURST", 50))
+    
+    # 推送发件箱: OUTBOX_ENABLED=1 时 worker 把渲染好的推送写入 Redis Stream，由独立的 dispatcher.py 进程
+    # (可多开) 以消费组读取并发送，进程重启不丢推送；0 (默认) 表示在 worker 进程内直接发送。
+    # OUTBOX_MAXLEN 为 Stream 长度上限，须远大于积压量；DISPATCH_RATE 为每个 dispatcher 进程中每个机器人的全局发送速率
+    # (条/秒)，多个进程共用机器人时按进程数均分 30 条/秒
+    OUTBOX_ENABLED = os.getenv("OUTBOX_ENABLED", "0") == "1"
+    OUTBOX_STREAM = os.getenv("OUTBOX_STREAM", "notify:outbox")
+    OUTBOX_MAXLEN = int(os.getenv("OUTBOX_MAXLEN", 200000))
+    DISPATCH_RATE = float(os.getenv("DISPATCH_RATE", 30))
+    
+    # Worker: 编译好的关键词配置快照，重启时先从快照启动再补齐数据库增量，留空表示不使用
+    SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "data/worker_config.snap")
+    
     # Postgres
     DB_DSN = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
     
@@ -0,0 +1,69 @@
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class MessageDeduper:
+    """多监听账号的消息去重，键为 (chat_id, message_id)
+
+    进程内用有界 LRU + TTL 判断；配置了 redis 时，命中关键词的消息再用
+    SET NX EX 在多个 worker 进程之间抢占，只有抢到的进程继续推送。
+    """
+
+    def __init__(self, maxsize=50000, ttl=600, redis=None, prefix="dedup:msg:"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.redis = redis
+        self.prefix = prefix
+        self._seen = OrderedDict()
+        self.local_hits = 0
+        self.local_misses = 0
+        self.remote_hits = 0
+        self.remote_misses = 0
+        self.errors = 0
+
+    def first_local(self, chat_id, message_id):
+        """进程内首次出现返回 True；同步执行，同一进程内的多个监听账号不会并发穿透"""
+        key = (chat_id, message_id)
+        now = time.monotonic()
+        seen = self._seen
+        ts = seen.get(key)
+        if ts is not None and now - ts < self.ttl:
+            self.local_hits += 1
+            return False
+        seen[key] = now
+        seen.move_to_end(key)
+        # 超出容量或已过期的从最旧一端淘汰
+        while seen:
+            old_key, old_ts = next(iter(seen.items()))
+            if len(seen) <= self.maxsize and now - old_ts < self.ttl: break
+            seen.popitem(last=False)
+        self.local_misses += 1
+        return True
+
+    async def first_global(self, chat_id, message_id):
+        """跨进程抢占；未配置 redis 或 redis 异常时视为首次出现"""
+        if self.redis is None: return True
+        try:
+            ok = await self.redis.set(f"{self.prefix}{chat_id}:{message_id}", 1, nx=True, ex=self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.debug(f"去重 redis 异常: {e}")
+            ok = True
+        if not ok:
+            self.remote_hits += 1
+            return False
+        self.remote_misses += 1
+        return True
+
+    def stats(self):
+        return {
+            "local_hits": self.local_hits,
+            "local_misses": self.local_misses,
+            "remote_hits": self.remote_hits,
+            "remote_misses": self.remote_misses,
+            "errors": self.errors,
+            "size": len(self._seen),
+        }
@@ -0,0 +1,73 @@
+import heapq
+import time
+
+MAX_MESSAGE_LEN = 4096  # Telegram 单条消息长度上限
+
+
+class Digest:
+    __slots__ = ("target", "lines", "size", "deadline")
+
+    def __init__(self, target, deadline):
+        self.target = target
+        self.lines = []
+        self.size = 0
+        self.deadline = deadline
+
+
+class DigestBuffer:
+    """按推送目标 (notify_target_id / tg_id) 合并通知，到期或攒满一条消息时整体发出
+
+    每个目标最多一个打开的摘要，到期时间在第一条加入时确定 (之后的加入不会推迟)，
+    因此最长延迟不超过窗口。各目标的窗口可以不同 (add 时指定)。
+    到期时间放在最小堆里，flush 只查看堆顶，打开的摘要再多，每次检查的代价也只与到期数量有关。
+    """
+
+    def __init__(self, window=300, max_len=MAX_MESSAGE_LEN, header=""):
+        self.window = window
+        self.max_len = max_len
+        self.header = header
+        self._open = {}  # target -> Digest
+        self._deadlines = []  # (deadline, target)
+
+    def __len__(self):
+        return len(self._open)
+
+    def add(self, target, line, now=None, window=None):
+        """加入一行；攒满一条消息时返回需要立即发送的 (target, text)，否则 None
+
+        window 为该目标新开摘要时使用的窗口 (秒)，默认 self.window
+        """
+        now = time.monotonic() if now is None else now
+        out = None
+        d = self._open.get(target)
+        if d is not None and d.size + len(line) + 1 > self.max_len - len(self.header):
+            out = self._close(target)
+            d = None
+        if d is None:
+            d = self._open[target] = Digest(target, now + (self.window if window is None else window))
+            heapq.heappush(self._deadlines, (d.deadline, target))
+        d.lines.append(line)
+        d.size += len(line) + 1
+        return out
+
+    def _close(self, target):
+        d = self._open.pop(target)
+        return target, self.header + "\n".join(d.lines)
+
+    def due(self, now=None):
+        """取出所有已到期的摘要"""
+        now = time.monotonic() if now is None else now
+        out = []
+        heap = self._deadlines
+        while heap and heap[0][0] <= now:
+            deadline, target = heapq.heappop(heap)
+            d = self._open.get(target)
+            # 堆里可能留有已提前发出的旧摘要的到期时间
+            if d is not None and d.deadline == deadline: out.append(self._close(target))
+        return out
+
+    def drain(self):
+        """取出全部摘要 (退出前使用)"""
+        out = [self._close(t) for t in list(self._open)]
+        self._deadlines.clear()
+        return out
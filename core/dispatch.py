@@ -0,0 +1,238 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+
+logger = logging.getLogger(__name__)
+
+# Telegram 限制: 全局约 30 条/秒；同一私聊约 1 条/秒；同一群组约 20 条/分钟。
+# 这些限制按滑动窗口计算，单个目标不允许突发，只按固定间隔发送
+GLOBAL_RATE = 30
+PRIVATE_RATE, PRIVATE_BURST = 1.0, 1
+GROUP_RATE, GROUP_BURST = 20 / 60, 1
+
+
+class QueueOverflow(Exception):
+    """单个目标积压过多，最早的推送被挤掉"""
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "ts", "blocked_until")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.ts = now
+        self.blocked_until = 0.0  # 收到 RetryAfter 后在此之前不再发送
+
+    def ready_at(self, now):
+        """最早可以发送的时间 (<= now 表示现在就可以)"""
+        if now - self.ts > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.ts) * self.rate)
+            self.ts = now
+        at = now if self.tokens >= 1 else now + (1 - self.tokens) / self.rate
+        return max(at, self.blocked_until)
+
+    def take(self):
+        self.tokens -= 1
+
+
+class Outgoing:
+    __slots__ = ("chat_id", "kwargs", "on_sent", "on_failed", "attempts", "queued_at")
+
+    def __init__(self, chat_id, kwargs, on_sent, now, on_failed=None):
+        self.chat_id = chat_id
+        self.kwargs = kwargs
+        self.on_sent = on_sent
+        self.on_failed = on_failed
+        self.attempts = 0
+        self.queued_at = now
+
+
+class Dispatcher:
+    """推送调度器: 匹配流程只把消息放进队列，由调度器按 Telegram 的限速发出
+
+    每个目标一个先进先出队列和一个令牌桶 (群组比私聊更严)，另有一个全局令牌桶。
+    有待发消息的目标按最早可发送时间放在最小堆里，调度循环只看堆顶。
+    RetryAfter 时该目标暂停指定秒数后重发；网络等其它异常按指数退避最多重试 max_attempts 次；
+    对方屏蔽机器人 (Forbidden) 或请求本身无效 (BadRequest) 直接丢弃。
+    待发总数超过 max_pending 时新消息直接丢弃并计数。
+    单个目标积压超过 max_per_target 条时挤掉该目标最早的一条 (on_failed 收到 QueueOverflow)，
+    命中很多的订阅者只会自己丢旧推送，不会占满总队列、连累其它订阅者。
+    """
+
+    def __init__(self, send, rate=GLOBAL_RATE, concurrency=8, max_pending=10000, max_per_target=20, max_attempts=3, retry_base=1.0):
+        self.send = send
+        self.max_pending = max_pending
+        self.max_per_target = max_per_target
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self._global = TokenBucket(rate, 1, time.monotonic())
+        self._buckets = {}  # chat_id -> TokenBucket
+        self._queues = {}  # chat_id -> deque[Outgoing]
+        self._heap = []  # (最早发送时间, 序号, chat_id)，每个有待发消息的目标只出现一次
+        self._seq = itertools.count()
+        self._pending = 0
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(concurrency)
+        self._inflight = set()
+        self.sent = 0
+        self.dropped = 0  # 队列满被丢弃
+        self.overflow = 0  # 单个目标积压过多被挤掉
+        self.failed = 0  # 重试耗尽或不可重试的错误
+        self.retried = 0
+        self.retry_after = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def __len__(self):
+        return self._pending
+
+    def _bucket(self, chat_id, now):
+        b = self._buckets.get(chat_id)
+        if b is None:
+            # 负数 chat_id 为群组/频道
+            b = self._buckets[chat_id] = TokenBucket(GROUP_RATE, GROUP_BURST, now) if chat_id < 0 else TokenBucket(PRIVATE_RATE, PRIVATE_BURST, now)
+        return b
+
+    def _schedule(self, chat_id, now):
+        heapq.heappush(self._heap, (self._bucket(chat_id, now).ready_at(now), next(self._seq), chat_id))
+        self._wakeup.set()
+
+    def submit(self, chat_id, on_sent=None, on_failed=None, **kwargs):
+        """放入发送队列 (不等待网络)，队列已满返回 False
+
+        on_sent 为发送成功后调用的协程函数；on_failed 为放弃发送 (不可重试或重试耗尽) 后调用的协程函数，参数为异常
+        """
+        if self._pending >= self.max_pending:
+            self.dropped += 1
+            return False
+        now = time.monotonic()
+        q = self._queues.get(chat_id)
+        if q is None:
+            q = self._queues[chat_id] = deque()
+            self._schedule(chat_id, now)
+        elif len(q) >= self.max_per_target:
+            old = q.popleft()
+            self._pending -= 1
+            self.overflow += 1
+            if old.on_failed is not None: asyncio.create_task(self._give_up(old, QueueOverflow(f"目标 {chat_id} 积压超过 {self.max_per_target} 条")))
+        q.append(Outgoing(chat_id, kwargs, on_sent, now, on_failed))
+        self._pending += 1
+        return True
+
+    def _requeue(self, item, not_before):
+        """发送失败的消息放回其目标队列的最前面"""
+        now = time.monotonic()
+        b = self._bucket(item.chat_id, now)
+        b.blocked_until = max(b.blocked_until, not_before)
+        q = self._queues.get(item.chat_id)
+        if q is None:
+            q = self._queues[item.chat_id] = deque()
+            self._schedule(item.chat_id, now)
+        q.appendleft(item)
+        self._pending += 1
+
+    async def run(self):
+        heap = self._heap
+        while True:
+            if not heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = time.monotonic()
+            at, _, chat_id = heap[0]
+            wait = max(at, self._global.ready_at(now)) - now
+            if wait > 0:
+                # 等到堆顶可发送，期间有新消息或重试进来时提前醒来重新检查
+                self._wakeup.clear()
+                try: await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError: pass
+                continue
+            heapq.heappop(heap)
+            bucket = self._bucket(chat_id, now)
+            at = bucket.ready_at(now)
+            if at > now:
+                # 入堆之后又被 RetryAfter 推迟了
+                heapq.heappush(heap, (at, next(self._seq), chat_id))
+                continue
+            q = self._queues[chat_id]
+            item = q.popleft()
+            self._pending -= 1
+            bucket.take()
+            self._global.take()
+            if q: heapq.heappush(heap, (bucket.ready_at(now), next(self._seq), chat_id))
+            else: del self._queues[chat_id]
+            await self._slots.acquire()
+            task = asyncio.create_task(self._deliver(item))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _deliver(self, item):
+        try:
+            item.attempts += 1
+            await self.send(chat_id=item.chat_id, **item.kwargs)
+        except TelegramRetryAfter as e:
+            self.retry_after += 1
+            self._requeue(item, time.monotonic() + e.retry_after)
+            return
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            self.failed += 1
+            logger.debug(f"推送被拒绝 -> {item.chat_id}: {e}")
+            await self._give_up(item, e)
+            return
+        except Exception as e:
+            if item.attempts >= self.max_attempts:
+                self.failed += 1
+                logger.error(f"推送失败 -> {item.chat_id} (已重试 {item.attempts - 1} 次): {e}")
+                await self._give_up(item, e)
+                return
+            self.retried += 1
+            self._requeue(item, time.monotonic() + self.retry_base * 2 ** (item.attempts - 1))
+            return
+        finally:
+            self._slots.release()
+        self.sent += 1
+        latency = time.monotonic() - item.queued_at
+        self.latency_sum += latency
+        if latency > self.latency_max: self.latency_max = latency
+        if item.on_sent is not None:
+            try: await item.on_sent()
+            except Exception as e: logger.error(f"推送后续处理失败: {e}")
+
+    async def _give_up(self, item, error):
+        if item.on_failed is None: return
+        try: await item.on_failed(error)
+        except Exception as e: logger.error(f"推送失败处理出错: {e}")
+
+    def prune(self):
+        """删除没有待发消息、令牌已补满且未被暂停的目标的令牌桶"""
+        now = time.monotonic()
+        idle = [c for c, b in self._buckets.items()
+                if c not in self._queues and b.blocked_until <= now and b.ready_at(now) <= now and b.tokens >= b.burst]
+        for c in idle: del self._buckets[c]
+
+    async def drain(self, timeout=10):
+        """等待队列发完 (关闭前调用)，超时后放弃剩余消息"""
+        deadline = time.monotonic() + timeout
+        while (self._pending or self._inflight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return self._pending
+
+    def stats(self):
+        return {
+            "pending": self._pending,
+            "targets": len(self._queues),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "overflow": self.overflow,
+            "failed": self.failed,
+            "retried": self.retried,
+            "retry_after": self.retry_after,
+            "latency_avg": round(self.latency_sum / self.sent, 3) if self.sent else 0.0,
+            "latency_max": round(self.latency_max, 3),
+        }
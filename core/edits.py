@@ -0,0 +1,76 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+
+def content_digest(text):
+    """消息内容的 64 位指纹；跨进程稳定 (内置 hash 每个进程不同)，可用作 redis 键"""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class TrackedMessage:
+    __slots__ = ("digest", "keys", "ts")
+
+    def __init__(self, digest, keys, ts):
+        self.digest = digest
+        self.keys = keys  # 该消息历次内容命中过的关键词键 (已推送过)
+        self.ts = ts
+
+
+class EditTracker:
+    """已处理消息的内容指纹与命中关键词 (有界 LRU + TTL)，用于编辑消息的增量匹配
+
+    编辑后内容不变 (表情回应、按钮变化等) 直接跳过；内容变化时重新匹配，
+    只推送该消息此前没有命中过的关键词。记录只存在本进程内。
+    """
+
+    def __init__(self, maxsize=50000, ttl=2 * 86400):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self.unchanged = 0
+        self.rematched = 0
+        self.untracked = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, chat_id, message_id):
+        item = self._items.get((chat_id, message_id))
+        if item is not None and time.monotonic() - item.ts >= self.ttl: return None
+        return item
+
+    def check_edit(self, chat_id, message_id, digest, text_edited=True):
+        """编辑事件: 无需处理返回 None，否则返回该消息此前已命中的关键词键
+
+        未记录过的消息 (早于缓存或由其它进程处理) 只在确有文字编辑 (text_edited) 时按新消息处理。
+        """
+        item = self.get(chat_id, message_id)
+        if item is None:
+            if not text_edited: return None
+            self.untracked += 1
+            return frozenset()
+        if item.digest == digest:
+            self.unchanged += 1
+            return None
+        self.rematched += 1
+        return item.keys
+
+    def remember(self, chat_id, message_id, digest, keys):
+        key = (chat_id, message_id)
+        now = time.monotonic()
+        items = self._items
+        items[key] = TrackedMessage(digest, frozenset(keys), now)
+        items.move_to_end(key)
+        while items:
+            old = next(iter(items.values()))
+            if len(items) <= self.maxsize and now - old.ts < self.ttl: break
+            items.popitem(last=False)
+
+    def stats(self):
+        return {
+            "unchanged": self.unchanged,
+            "rematched": self.rematched,
+            "untracked": self.untracked,
+            "size": len(self._items),
+        }
@@ -0,0 +1,97 @@
+import math
+import time
+
+NORMAL, MATCHED_ONLY, SAMPLING, MUTED = 0, 1, 2, 3
+LEVEL_NAMES = ("normal", "matched_only", "sampling", "muted")
+
+
+class ChatBucket:
+    __slots__ = ("tokens", "ts", "excess", "level", "since", "dropped")
+
+    def __init__(self, burst, now):
+        self.tokens = float(burst)
+        self.ts = now
+        self.excess = 0.0  # 指数衰减的超额消息数
+        self.level = NORMAL
+        self.since = now  # 最近一次升级的时间
+        self.dropped = 0
+
+
+class ChatFloodGuard:
+    """按群的令牌桶，单个群刷屏时逐级降级，避免拖慢其它群
+
+    每个群每秒补充 rate 个令牌，最多存 burst 个。令牌不足的消息计入超额 (时间常数 tau 衰减)：
+      超额 >= 1            MATCHED_ONLY  只做关键词匹配，忽略编辑、跳过历史查询等附加处理
+      超额 >= burst        SAMPLING      只处理有令牌的消息，相当于按 rate 采样
+      超额 >= 4 * burst    MUTED         全部丢弃
+    升级立即生效；超额回落后，距上次升级满 cooldown 秒才降一级，逐级恢复。
+    """
+
+    def __init__(self, rate=5, burst=50, tau=10, cooldown=30):
+        self.rate = rate
+        self.burst = burst
+        self.tau = tau
+        self.cooldown = cooldown
+        self._buckets = {}  # chat_id -> ChatBucket
+        self.dropped = 0
+
+    def _settle(self, b, now):
+        """补充令牌、衰减超额，并按冷却时间逐级恢复"""
+        dt = now - b.ts
+        if dt <= 0: return
+        b.ts = now
+        b.tokens = min(self.burst, b.tokens + dt * self.rate)
+        b.excess *= math.exp(-dt / self.tau)
+        if b.level > NORMAL and self._target(b.excess) < b.level:
+            steps = int((now - b.since) // self.cooldown)
+            if steps > 0:
+                b.level = max(self._target(b.excess), b.level - steps)
+                b.since = now
+
+    def _target(self, excess):
+        if excess >= 4 * self.burst: return MUTED
+        if excess >= self.burst: return SAMPLING
+        return MATCHED_ONLY if excess >= 1 else NORMAL
+
+    def admit(self, chat_id, now=None):
+        """消息到达时调用，返回 (是否处理, 降级等级)"""
+        now = time.monotonic() if now is None else now
+        b = self._buckets.get(chat_id)
+        if b is None: b = self._buckets[chat_id] = ChatBucket(self.burst, now)
+        self._settle(b, now)
+        has_token = b.tokens >= 1
+        if has_token: b.tokens -= 1
+        else: b.excess += 1
+        target = self._target(b.excess)
+        if target > b.level: b.level, b.since = target, now
+
+        level = b.level
+        if level == MUTED or (level == SAMPLING and not has_token):
+            b.dropped += 1
+            self.dropped += 1
+            return False, level
+        return True, level
+
+    def level(self, chat_id):
+        b = self._buckets.get(chat_id)
+        return NORMAL if b is None else b.level
+
+    def prune(self, now=None):
+        """更新各群的降级状态 (没有新消息的群也会按时恢复)，删除已恢复正常且令牌已补满的群"""
+        now = time.monotonic() if now is None else now
+        idle = []
+        for c, b in self._buckets.items():
+            self._settle(b, now)
+            if b.level == NORMAL and b.tokens >= self.burst: idle.append(c)
+        for c in idle: del self._buckets[c]
+
+    def degraded(self):
+        """{chat_id: (等级名, 已丢弃条数)}，只列出处于降级状态的群"""
+        return {c: (LEVEL_NAMES[b.level], b.dropped) for c, b in self._buckets.items() if b.level != NORMAL}
+
+    def stats(self):
+        return {
+            "chats": len(self._buckets),
+            "dropped": self.dropped,
+            "degraded": {str(c): {"level": name, "dropped": n} for c, (name, n) in self.degraded().items()},
+        }
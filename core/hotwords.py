@@ -0,0 +1,127 @@
+import heapq
+import time
+from array import array
+
+MASK64 = (1 << 64) - 1
+
+
+class CountMinSketch:
+    """计数草图: depth 行 x width 列计数器，估计值只会偏大不会偏小"""
+
+    __slots__ = ("width", "depth", "rows")
+
+    def __init__(self, width=2048, depth=4):
+        self.width = width
+        self.depth = depth
+        self.rows = [array("I", bytes(4 * width)) for _ in range(depth)]
+
+    def _cols(self, item):
+        # 一次 hash 拆成两半，按 h1 + i*h2 生成 depth 个列号
+        h = hash(item) & MASK64
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        w = self.width
+        return [(h1 + i * h2) % w for i in range(self.depth)]
+
+    def add(self, item, n=1):
+        est = None
+        for row, col in zip(self.rows, self._cols(item)):
+            v = row[col] + n
+            row[col] = v
+            if est is None or v < est: est = v
+        return est
+
+    def query(self, item):
+        return min(row[col] for row, col in zip(self.rows, self._cols(item)))
+
+    def subtract(self, other):
+        for mine, theirs in zip(self.rows, other.rows):
+            for i, v in enumerate(theirs):
+                if v: mine[i] -= v
+
+    def clear(self):
+        for row in self.rows:
+            row[:] = array("I", bytes(4 * self.width))
+
+
+class HotKeywordTracker:
+    """滑动窗口内的关键词命中率统计 (计数草图 + Top-K 堆)
+
+    窗口切成 slots 个时间片，每片一份草图，另维护一份所有时间片之和的汇总草图；
+    时间片过期时从汇总中减去再清空，因此查询始终是 O(depth)。
+    Top-K 用最小堆维护 (堆内可能有过期的旧估计值，出堆时与 _top 比对后丢弃)。
+    """
+
+    def __init__(self, window=600, slots=10, width=2048, depth=4, k=20):
+        self.window = window
+        self.slots = slots
+        self.slot_len = window / slots
+        self.k = k
+        self._sketches = [CountMinSketch(width, depth) for _ in range(slots)]
+        self._msgs = [0] * slots
+        self._total = CountMinSketch(width, depth)
+        self._cur = 0
+        self._slot_start = None
+        self._top = {}  # 关键词 -> 当前估计值
+        self._heap = []  # (估计值, 关键词)，懒删除
+
+    def _advance(self, now):
+        if self._slot_start is None: self._slot_start = now
+        steps = int((now - self._slot_start) // self.slot_len)
+        if steps <= 0: return
+        for _ in range(min(steps, self.slots)):
+            self._cur = (self._cur + 1) % self.slots
+            old = self._sketches[self._cur]
+            self._total.subtract(old)
+            old.clear()
+            self._msgs[self._cur] = 0
+        self._slot_start += steps * self.slot_len
+        # 窗口滑动后估计值整体下降，重新取一次 Top-K 的估计值
+        total = self._total
+        self._top = {w: c for w in self._top if (c := total.query(w)) > 0}
+        self._heap = [(c, w) for w, c in self._top.items()]
+        heapq.heapify(self._heap)
+
+    def record(self, words, now=None):
+        """记录一条已扫描的消息及其命中的关键词 (未命中时 words 为空)"""
+        now = time.monotonic() if now is None else now
+        self._advance(now)
+        self._msgs[self._cur] += 1
+        if not words: return
+        cur, total, top, heap, k = self._sketches[self._cur], self._total, self._top, self._heap, self.k
+        for w in words:
+            cur.add(w)
+            est = total.add(w)
+            if w in top or len(top) < k:
+                top[w] = est
+                heapq.heappush(heap, (est, w))
+                continue
+            # 丢掉堆顶已失效的记录，再与当前最小值比较
+            while heap and top.get(heap[0][1]) != heap[0][0]: heapq.heappop(heap)
+            if heap and est > heap[0][0]:
+                _, out = heapq.heapreplace(heap, (est, w))
+                top.pop(out, None)
+                top[w] = est
+        if len(heap) > 4 * k:
+            self._heap = heap = [(c, w) for w, c in top.items()]
+            heapq.heapify(heap)
+
+    def messages(self):
+        return sum(self._msgs)
+
+    def top(self, now=None):
+        """[(关键词, 窗口内命中数, 命中率)]，按命中数降序"""
+        self._advance(time.monotonic() if now is None else now)
+        n = self.messages()
+        items = sorted(self._top.items(), key=lambda x: -x[1])
+        return [(w, c, c / n if n else 0.0) for w, c in items]
+
+    def over_ratio(self, ratio, min_hits=50, now=None):
+        """命中率不低于 ratio 且命中数足够 (避免小样本误判) 的关键词"""
+        return {w for w, c, r in self.top(now) if c >= min_hits and r >= ratio}
+
+    def stats(self):
+        return {
+            "window": self.window,
+            "messages": self.messages(),
+            "top": [{"word": w, "hits": c, "ratio": round(r, 4)} for w, c, r in self.top()],
+        }
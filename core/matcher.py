@@ -0,0 +1,519 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import select
+import subprocess
+import sys
+import threading
+import time
+import weakref
+from array import array
+from collections import deque
+from core.normalize import DEFAULT_NORMALIZER
+from core.rules import compile_rule
+
+logger = logging.getLogger(__name__)
+
+
+class LazyRows(dict):
+    """按需展开的行表: 从快照加载时，自动机状态等在第一次被访问时才解码"""
+
+    __slots__ = ("_decode",)
+
+    def __init__(self, decode):
+        super().__init__()
+        self._decode = decode
+
+    def __missing__(self, i):
+        row = self[i] = self._decode(i)
+        return row
+
+
+class KeywordMatcher:
+    """多模式关键词自动机 (Aho-Corasick)
+
+    构建后只读，load_settings 每次生成一个新实例再整体替换，
+    扫描一条消息的开销为 O(len(text) + 命中数)，与关键词总数无关。
+    """
+
+    __slots__ = ("words", "_goto", "_fail", "_out")
+
+    def __init__(self, words):
+        self.words = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        index = {}
+        for w in words:
+            if not w or w in index: continue
+            index[w] = len(self.words)
+            self.words.append(w)
+            self._insert(w, index[w])
+        self._build_fail()
+
+    def _insert(self, word, pid):
+        goto, state = self._goto, 0
+        for ch in word:
+            nxt = goto[state].get(ch)
+            if nxt is None:
+                nxt = len(goto)
+                goto[state][ch] = nxt
+                goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] = self._out[state] + (pid,)
+
+    def _build_fail(self):
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(ch, 0)
+                fail[nxt] = f if f != nxt else 0
+                # 合并后缀输出，扫描时无需再沿 fail 链回溯
+                if out[fail[nxt]]:
+                    out[nxt] = out[nxt] + out[fail[nxt]]
+
+    def __len__(self):
+        return len(self.words)
+
+    def to_arrays(self):
+        """导出为扁平 int32 数组 (快照用): 每个状态的转移、fail 指针与输出"""
+        gidx, gchr, gnxt = array("i", (0,)), array("i"), array("i")
+        oidx, oout = array("i", (0,)), array("i")
+        goto, out = self._goto, self._out
+        for state in range(len(self._fail)):
+            for ch, nxt in goto[state].items():
+                gchr.append(ord(ch))
+                gnxt.append(nxt)
+            gidx.append(len(gchr))
+            oout.extend(out[state])
+            oidx.append(len(oout))
+        return {"gidx": gidx, "gchr": gchr, "gnxt": gnxt, "fail": array("i", self._fail), "oidx": oidx, "oout": oout}
+
+    @classmethod
+    def from_arrays(cls, words, a):
+        """由 to_arrays() 的结果 (可以是 mmap 上的 memoryview) 还原，状态按需展开"""
+        m = cls.__new__(cls)
+        m.words = words
+        gidx, gchr, gnxt, oidx, oout = a["gidx"], a["gchr"], a["gnxt"], a["oidx"], a["oout"]
+        m._goto = LazyRows(lambda s: {chr(c): n for c, n in zip(gchr[gidx[s]:gidx[s + 1]], gnxt[gidx[s]:gidx[s + 1]])})
+        m._fail = a["fail"]
+        m._out = LazyRows(lambda s: tuple(oout[oidx[s]:oidx[s + 1]]))
+        return m
+
+    def iter_hits(self, text):
+        """逐个产出 (结束位置, 关键词序号)"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for pid in out[state]:
+                    yield i, pid
+
+    def first(self, text):
+        """返回第一个命中的关键词，没有命中返回 None"""
+        for _, pid in self.iter_hits(text):
+            return self.words[pid]
+        return None
+
+    def hit_ids(self, text):
+        """一次扫描返回全部命中的关键词序号集合"""
+        return {pid for _, pid in self.iter_hits(text)}
+
+
+class OwnedMatcher:
+    """带归属的自动机: 每个词记录拥有它的用户集合
+
+    用于全局过滤词索引，扫描一次即可得到所有"命中了自己过滤词"的用户。
+    """
+
+    __slots__ = ("matcher", "owners")
+
+    def __init__(self, word_owners):
+        self.matcher = KeywordMatcher(word_owners.keys())
+        self.owners = [frozenset(word_owners[w]) for w in self.matcher.words]
+
+    def __len__(self):
+        return len(self.matcher)
+
+    def to_arrays(self):
+        a = self.matcher.to_arrays()
+        widx, wown = array("i", (0,)), array("q")
+        for pid in range(len(self.matcher.words)):
+            wown.extend(self.owners[pid])
+            widx.append(len(wown))
+        a.update(widx=widx, wown=wown)
+        return a
+
+    @classmethod
+    def from_arrays(cls, words, a):
+        m = cls.__new__(cls)
+        m.matcher = KeywordMatcher.from_arrays(words, a)
+        widx, wown = a["widx"], a["wown"]
+        m.owners = LazyRows(lambda p: frozenset(wown[widx[p]:widx[p + 1]]))
+        return m
+
+    def owners_hit(self, text):
+        """返回过滤词出现在 text 中的用户集合"""
+        owners = self.owners
+        hit = set()
+        for pid in self.matcher.hit_ids(text):
+            hit |= owners[pid]
+        return hit
+
+
+# ==================================================================
+# 匹配模式 (keywords.match_mode)
+# ==================================================================
+# fuzzy     : 默认模式，子串匹配；词中的 ? 代表任意 0~10 个字符 (如 谁?卖?号)
+# substring : 子串匹配
+# word      : 整词匹配，前后不能紧挨字母/数字 (中文字符不算词字符)
+# prefix    : 词首匹配，前面不能紧挨字母/数字
+# exact     : 整条消息 (去掉首尾空白) 与关键词完全相同
+# regex     : 用户正则
+# rule      : 布尔/邻近规则，语法见 core/rules.py
+MODE_KIND = {"fuzzy": "substring", "substring": "substring", "word": "word",
+             "prefix": "prefix", "exact": "exact", "regex": "regex", "rule": "rule"}
+LITERAL_KINDS = ("substring", "word", "prefix")  # 快照里按下标存储，只能在末尾追加
+DEFAULT_MODE = "fuzzy"
+WILDCARD_GAP = ".{0,10}"
+_WILDCARD = re.compile("[?？]")  # 全角问号同样是通配符 (中文输入法下常打出 ？)
+
+# 用户正则的防护参数
+MAX_REGEX_LEN = 200  # 单个正则最大长度
+REGEX_BATCH = 32  # 每批合并成一个大正则的数量
+REGEX_SCAN_LIMIT = 4000  # 正则只扫描消息前 N 个字符
+REGEX_TIMEOUT = 0.1  # 单批正则在隔离进程里的最长执行时间 (秒)，超时即杀掉进程并隔离该批
+REGEX_START_TIMEOUT = 10  # 隔离进程启动并编译全部正则的最长等待 (秒)
+REGEX_WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regex_worker.py")
+QUARANTINED_REGEX = set()  # 被隔离的正则，进程内不再编译
+# 嵌套量词 (a+)+ / 反向引用 / 命名分组 容易导致回溯爆炸或无法合并，直接拒绝
+_UNSAFE_REGEX = re.compile(r"\([^()]*[*+}][^()]*\)[*+{]|\\[1-9]|\(\?P[<=]")
+
+
+def _is_word_char(ch):
+    # 中日韩文字没有空格分词，不参与边界判断
+    return ch == "_" or (ch.isalnum() and ord(ch) < 0x2E80)
+
+
+def compile_user_regex(pattern):
+    """编译用户正则，不安全或无法编译时返回 None"""
+    if not pattern or len(pattern) > MAX_REGEX_LEN or pattern in QUARANTINED_REGEX: return None
+    if _UNSAFE_REGEX.search(pattern): return None
+    try:
+        return re.compile(pattern)
+    except re.error:
+        return None
+
+
+def _stop_process(proc):
+    proc.kill()
+    proc.wait()
+    proc.stdin.close()
+    proc.stdout.close()
+
+
+class RegexProcess:
+    """运行用户正则的子进程 (core/regex_worker.py)，按行收发，读取带超时
+
+    re 在 C 代码里回溯时不释放 GIL、也无法被线程打断，只能放到独立进程里执行，超时直接杀掉。
+    """
+
+    def __init__(self, specs):
+        self.proc = subprocess.Popen([sys.executable, REGEX_WORKER], stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0)
+        self._buf = b""
+        self.ready = False
+        # 引擎被替换、对象回收时随之结束子进程
+        self.close = weakref.finalize(self, _stop_process, self.proc)
+        self.send(specs)
+
+    def wait_ready(self, timeout=REGEX_START_TIMEOUT):
+        """等待子进程编译完全部正则"""
+        if self.ready: return
+        if self.readline(timeout) != b"ready": raise RuntimeError("正则进程启动超时")
+        self.ready = True
+
+    def send(self, obj):
+        self.proc.stdin.write(json.dumps(obj).encode() + b"\n")
+
+    def readline(self, timeout):
+        """读一行，超时返回 None，子进程已退出时抛出 EOFError"""
+        fd = self.proc.stdout.fileno()
+        deadline = time.monotonic() + timeout
+        while b"\n" not in self._buf:
+            left = deadline - time.monotonic()
+            if left <= 0 or not select.select([fd], [], [], left)[0]: return None
+            chunk = os.read(fd, 65536)
+            if not chunk: raise EOFError("正则进程已退出")
+            self._buf += chunk
+        line, _, self._buf = self._buf.partition(b"\n")
+        return line
+
+
+class RegexSet:
+    """用户正则集合: 每批合并成一个交替正则做预筛，只有整批命中时才逐个确认
+
+    匹配在隔离子进程 (RegexProcess) 里执行，单批超过 REGEX_TIMEOUT 即杀掉子进程并拆分该批，
+    换新的子进程从拆开的批次接着扫描，直到慢正则被单独隔离，同批与之后的正则照常得出结果。
+    search() 会阻塞等待子进程 (可能长达数个 REGEX_TIMEOUT)，事件循环里应放到线程中调用
+    (MatchEngine.scan_async)；同一时间只有一个调用者使用子进程。
+    """
+
+    def __init__(self, items):
+        compiled = []
+        for pattern, key in items:
+            rx = compile_user_regex(pattern)
+            if rx is None:
+                logger.warning(f"忽略不安全/无效的正则: {pattern}")
+                continue
+            compiled.append((rx, key))
+
+        self.batches = [self._batch(compiled[i:i + REGEX_BATCH]) for i in range(0, len(compiled), REGEX_BATCH)]
+        # 引擎通常在线程里构建，子进程也在这里先启动好，失败时推迟到第一次匹配再试
+        self._proc = None
+        self._lock = threading.Lock()
+        if self.batches:
+            try:
+                self._start().wait_ready()
+            except Exception as e:
+                self._stop()
+                logger.error(f"正则隔离进程启动失败: {e}")
+
+    def __len__(self):
+        return sum(len(chunk) for _, chunk in self.batches)
+
+    @staticmethod
+    def _batch(chunk):
+        try:
+            combined = re.compile("|".join(f"(?:{rx.pattern})" for rx, _ in chunk))
+        except re.error:
+            combined = None  # 含全局内联标志等无法合并的情况，退化为逐个匹配
+        return combined, chunk
+
+    def _isolate(self, i):
+        """超时的批次对半拆开，再次超时继续拆，直到定位到单条正则后隔离"""
+        chunk = self.batches[i][1]
+        if len(chunk) > 1:
+            half = len(chunk) // 2
+            self.batches[i:i + 1] = [self._batch(chunk[:half]), self._batch(chunk[half:])]
+            logger.warning(f"⚠️ 正则耗时超限，拆分排查 {len(chunk)} 条")
+            return
+        del self.batches[i]
+        rx = chunk[0][0]
+        QUARANTINED_REGEX.add(rx.pattern)
+        logger.warning(f"⚠️ 正则耗时超限，已隔离: {rx.pattern}")
+
+    def _start(self):
+        specs = [[combined.pattern if combined else None, [rx.pattern for rx, _ in chunk]] for combined, chunk in self.batches]
+        self._proc = RegexProcess(specs)
+        return self._proc
+
+    def _stop(self):
+        if self._proc is not None: self._proc.close()
+        self._proc = None
+
+    def search(self, text):
+        """返回 [(键, (起点, 终点))...]"""
+        if not self.batches: return []
+        text = text[:REGEX_SCAN_LIMIT]
+        with self._lock:
+            hits = []
+            i = 0
+            try:
+                while i < len(self.batches):
+                    proc = self._proc or self._start()
+                    proc.wait_ready()
+                    proc.send([i, text])
+                    while i < len(self.batches):
+                        line = proc.readline(REGEX_TIMEOUT)
+                        if line is None:
+                            # 超时: 拆分该批后换新的子进程，从拆开的批次接着扫描
+                            self._stop()
+                            self._isolate(i)
+                            break
+                        chunk = self.batches[i][1]
+                        for j, start, end in json.loads(line): hits.append((chunk[j][1], (start, end)))
+                        i += 1
+            except Exception as e:
+                self._stop()
+                logger.error(f"正则隔离进程异常: {e}")
+            return hits
+
+
+class MatchEngine:
+    """关键词匹配引擎
+
+    输入 (match_mode, word) 键列表。字面量模式 (子串/整词/词首) 共用一个自动机，
+    命中后再做边界判断；整句模式是一次字典查找；正则与通配符走 RegexSet；
+    规则的原子词也并入同一个自动机，只有原子词出现过的规则才会被求值。
+    字面量、整句与规则都在规范化文本上匹配，正则与边界判断使用原文。
+    scan() 返回命中的键列表 (去重，按发现顺序)。
+    """
+
+    def __init__(self, keys, normalizer=None):
+        self.normalizer = normalizer or DEFAULT_NORMALIZER
+        norm = self.normalizer.word
+        literal = {}
+        self.exact = {}
+        self.rules = []
+        rules_by_atom = {}
+        regex_items = []
+        for key in keys:
+            if self._add_special(key, regex_items): continue
+            mode, word = key
+            kind = MODE_KIND.get(mode, "substring")
+            if kind == "rule":
+                try:
+                    rule = compile_rule(word, self.normalizer.strict_word)
+                except ValueError as e:
+                    logger.warning(f"忽略无效规则 {word}: {e}")
+                    continue
+                for atom in rule.atoms:
+                    rules_by_atom.setdefault(atom, []).append(len(self.rules))
+                    literal.setdefault(atom, [])
+                self.rules.append((rule, key))
+            else:
+                literal.setdefault(norm(word), []).append((kind, key))
+
+        self.matcher = KeywordMatcher(literal)
+        self._entries = [tuple(literal[w]) for w in self.matcher.words]
+        self._rule_ids = [tuple(rules_by_atom.get(w, ())) for w in self.matcher.words]
+        self.regex = RegexSet(regex_items)
+
+    def _add_special(self, key, regex_items):
+        """整句、正则与通配符键不进自动机，处理后返回 True"""
+        mode, word = key
+        kind = MODE_KIND.get(mode, "substring")
+        if kind == "substring" and mode == DEFAULT_MODE and ("?" in word or "？" in word):
+            regex_items.append((WILDCARD_GAP.join(re.escape(p) for p in _WILDCARD.split(word)), key))
+        elif kind == "regex":
+            regex_items.append((word, key))
+        elif kind == "rule":
+            return False
+        elif not word.strip():
+            logger.warning(f"忽略空关键词: {key}")
+        elif (reason := self.normalizer.lossy(word)) is not None:
+            # 规范化会改变词义 (如 C++ 变成 c) 的词按原文匹配 (忽略大小写)，不进自动机
+            logger.warning(f"关键词 {word} {reason}，改为按原文匹配")
+            literal = f"(?i:{re.escape(word.strip())})"
+            regex_items.append((rf"^\s*{literal}\s*$" if kind == "exact" else literal, key))
+        elif kind == "exact":
+            self.exact.setdefault(self.normalizer.word(word), []).append(key)
+        else:
+            return False
+        return True
+
+    def __len__(self):
+        return len(self.matcher) + len(self.exact) + len(self.regex) + len(self.rules)
+
+    def to_arrays(self, key_index):
+        """导出为扁平数组 (快照用)；键以 key_index 中的下标表示"""
+        a = self.matcher.to_arrays()
+        codes = {k: i for i, k in enumerate(LITERAL_KINDS)}
+        eidx, ekind, ekey = array("i", (0,)), array("i"), array("i")
+        ridx, rrid = array("i", (0,)), array("i")
+        for pid in range(len(self.matcher.words)):
+            for kind, key in self._entries[pid]:
+                ekind.append(codes[kind])
+                ekey.append(key_index[key])
+            eidx.append(len(ekind))
+            rrid.extend(self._rule_ids[pid])
+            ridx.append(len(rrid))
+        # 整句/正则/规则数量少，加载时按键重新编译
+        special = array("i", (key_index[k] for keys in self.exact.values() for k in keys))
+        special.extend(key_index[k] for _, chunk in self.regex.batches for _, k in chunk)
+        rules = array("i", (key_index[k] for _, k in self.rules))
+        a.update(eidx=eidx, ekind=ekind, ekey=ekey, ridx=ridx, rrid=rrid, special=special, rules=rules)
+        return a
+
+    @classmethod
+    def from_arrays(cls, keys, words, a, normalizer=None):
+        """由 to_arrays() 的结果还原；keys 为导出时 key_index 对应的键列表"""
+        e = cls.__new__(cls)
+        e.normalizer = normalizer or DEFAULT_NORMALIZER
+        e.matcher = KeywordMatcher.from_arrays(words, a)
+        eidx, ekind, ekey, ridx, rrid = a["eidx"], a["ekind"], a["ekey"], a["ridx"], a["rrid"]
+        e._entries = LazyRows(lambda p: tuple((LITERAL_KINDS[ekind[i]], keys[ekey[i]]) for i in range(eidx[p], eidx[p + 1])))
+        e._rule_ids = LazyRows(lambda p: tuple(rrid[ridx[p]:ridx[p + 1]]))
+        e.exact = {}
+        regex_items = []
+        for i in a["special"]: e._add_special(keys[i], regex_items)
+        e.regex = RegexSet(regex_items)
+        # 规则顺序必须与 rrid 中的编号一致；编译失败说明快照与当前代码不匹配，由调用方放弃快照
+        e.rules = [(compile_rule(keys[i][1], e.normalizer.strict_word), keys[i]) for i in a["rules"]]
+        return e
+
+    async def scan_async(self, text, normalized=None, spans=None):
+        """同 scan()，正则部分放到线程里等待隔离子进程，不阻塞事件循环"""
+        hits = self.scan(text, normalized, spans, regex=False)
+        if not self.regex.batches: return hits
+        seen = set(hits)
+        for key, span in await asyncio.to_thread(self.regex.search, text):
+            if key not in seen:
+                seen.add(key)
+                hits.append(key)
+            if spans is not None: spans[key] = span
+        return hits
+
+    def scan(self, text, normalized=None, spans=None, regex=True):
+        """扫描一条消息
+
+        normalized: 调用方已算好的 normalizer.normalize(text) 结果，避免重复规范化
+        spans: 传入字典时，写入每个命中键在原文中的 (起点, 终点)，用于截取与高亮
+        regex: 为 False 时跳过正则与通配符 (由 scan_async 另行处理)
+        """
+        norm, offsets = normalized or self.normalizer.normalize(text)
+        hits = {}
+        positions = None
+        words, entries, rule_ids = self.matcher.words, self._entries, self._rule_ids
+        for end, pid in self.matcher.iter_hits(norm):
+            if not rule_ids[pid] and not entries[pid]: continue
+            o_start, o_end = offsets[end - len(words[pid]) + 1], offsets[end]
+            if rule_ids[pid]:
+                # 规则按原文位置求值，NEAR 的间隔与用户看到的字符数一致
+                if positions is None: positions, candidates = {}, set()
+                positions.setdefault(words[pid], []).append((o_start, o_end))
+                candidates.update(rule_ids[pid])
+            if not entries[pid]: continue
+            for kind, key in entries[pid]:
+                if key in hits: continue
+                if kind != "substring":
+                    if o_start > 0 and _is_word_char(text[o_start - 1]): continue
+                    if kind == "word" and o_end + 1 < len(text) and _is_word_char(text[o_end + 1]): continue
+                hits[key] = None
+                if spans is not None: spans[key] = (o_start, o_end + 1)
+        if positions:
+            # 只对原子词真正出现过的规则求值，开销与命中数相关而不是规则总数
+            for rid in sorted(candidates):
+                rule, key = self.rules[rid]
+                if key in hits or not rule.evaluate(positions): continue
+                hits[key] = None
+                if spans is not None:
+                    start, end = positions[next(a for a in rule.atoms if a in positions)][0]
+                    spans[key] = (start, end + 1)
+        if self.exact and norm in self.exact:
+            for key in self.exact[norm]:
+                hits[key] = None
+                if spans is not None: spans[key] = (0, len(text))
+        if regex and self.regex.batches:
+            for key, span in self.regex.search(text):
+                hits[key] = None
+                if spans is not None: spans[key] = span
+        return list(hits)
+
+
+EMPTY_OWNED = OwnedMatcher({})
+EMPTY_ENGINE = MatchEngine(())
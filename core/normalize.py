@@ -0,0 +1,109 @@
+import hashlib
+import unicodedata
+from array import array
+
+# 内置常用繁 -> 简对照 (广告/交易场景高频字)，完整表可通过 T2S_TABLE_PATH 指定文件加载
+BUILTIN_T2S = (
+    "們们 個个 會会 員员 聽听 監监 賣卖 買买 號号 價价 錢钱 幣币 網网 點点 擊击 鏈链 "
+    "開开 關关 時时 間间 問问 題题 發发 這这 對对 來来 為为 說说 還还 與与 從从 無无 "
+    "請请 讓让 認认 識识 議议 論论 變变 實实 寫写 氣气 電电 話话 費费 貨货 資资 賺赚 "
+    "賬账 帳帐 單单 優优 禮礼 處处 碼码 紅红 綠绿 藍蓝 黃黄 專专 業业 務务 營营 銷销 "
+    "車车 門门 見见 現现 長长 東东 動动 勞劳 場场 報报 頭头 圖图 團团 國国 際际 臺台 "
+    "灣湾 廣广 線线 級级 紙纸 組组 結结 給给 統统 經经 總总 館馆 飛飞 馬马 魚鱼 鳥鸟 "
+    "齊齐 齒齿 龍龙 龜龟 羅罗 貝贝 負负 貼贴 貴贵 販贩 購购 賭赌 職职 註注 冊册 錄录 "
+    "帶带 幫帮 準准 備备 復复 複复 獲获 據据 雙双 雜杂 難难 離离 體体 驗验 證证 壓压 "
+    "廠厂 歲岁 歷历 紀纪 顯显 響响 顏颜 風风 飯饭 鬥斗 麼么 "
+)
+
+# 视为分隔符的 Unicode 类别: 标点、空白、控制字符、格式字符 (零宽字符)、数学与修饰符号
+# 其它符号 (So，表情等) 与货币符号保留，可以单独作为关键词
+SEPARATOR_CATEGORIES = ("P", "Z", "Cc", "Cf", "Sk", "Sm")
+MEANINGFUL_SYMBOLS = ("Sk", "Sm")  # 关键词里含有这些符号时 (如 C++ / A+B)，规范化会改变词义
+
+
+def load_t2s_table(path=None):
+    """读取繁简对照表；文件格式为每行 "繁 简"，也兼容一行多组"""
+    table = {}
+    pairs = BUILTIN_T2S.split()
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0]
+                parts = line.split()
+                if len(parts) == 2 and len(parts[0]) == 1: pairs.append(parts[0] + parts[1])
+                else: pairs.extend(p for p in parts if len(p) == 2)
+    for p in pairs:
+        if len(p) == 2: table[p[0]] = p[1]
+    return table
+
+
+class Normalizer:
+    """消息/关键词规范化: NFKC -> 大小写折叠 -> 繁转简 -> 去零宽字符与分隔符
+
+    每个字符的转换结果查表得到 (按需计算后记忆)，整条文本只需一次线性扫描，
+    同时输出每个规范化字符对应的原文下标，用于边界判断和原文高亮。
+    """
+
+    def __init__(self, t2s=None):
+        self.t2s = load_t2s_table() if t2s is None else t2s
+        self._table = {}
+        # 常用区段预先算好
+        for start, end in ((0x20, 0x250), (0x3000, 0x3040), (0xFF00, 0xFFF0)):
+            for cp in range(start, end): self._char(chr(cp))
+
+    def _char(self, ch):
+        cat = unicodedata.category(ch)
+        if cat.startswith(SEPARATOR_CATEGORIES):
+            out = ""
+        else:
+            out = unicodedata.normalize("NFKC", ch).casefold()
+            out = "".join(self.t2s.get(c, c) for c in out if not unicodedata.category(c).startswith(SEPARATOR_CATEGORIES))
+        self._table[ch] = out
+        return out
+
+    def fingerprint(self):
+        """规范化规则的指纹 (繁简表、分隔符类别与 Unicode 版本)，规则不同时编译出的关键词不能混用"""
+        h = hashlib.md5(f"{unicodedata.unidata_version}{SEPARATOR_CATEGORIES}".encode())
+        for k in sorted(self.t2s): h.update(f"{k}{self.t2s[k]}".encode("utf-8"))
+        return h.hexdigest()
+
+    def normalize(self, text):
+        """返回 (规范化文本, 原文下标数组)"""
+        table = self._table
+        out = []
+        offsets = array("i")
+        for i, ch in enumerate(text):
+            mapped = table.get(ch)
+            if mapped is None: mapped = self._char(ch)
+            if not mapped: continue
+            out.append(mapped)
+            if len(mapped) == 1: offsets.append(i)
+            else: offsets.extend([i] * len(mapped))
+        return "".join(out), offsets
+
+    def word(self, text):
+        """只要规范化文本 (编译关键词时使用)"""
+        table = self._table
+        out = []
+        for ch in text:
+            mapped = table.get(ch)
+            if mapped is None: mapped = self._char(ch)
+            out.append(mapped)
+        return "".join(out)
+
+    def lossy(self, word):
+        """关键词规范化后不再表示原来的意思时返回原因 (空、只剩一个字符、去掉了 + = 等符号)，否则返回 None"""
+        nw = self.word(word)
+        if not nw: return "规范化后为空"
+        if len(nw) < 2 and len(word.strip()) >= 2: return f"规范化后只剩 {nw}"
+        if any(unicodedata.category(c) in MEANINGFUL_SYMBOLS for c in word): return "含有会被忽略的符号"
+        return None
+
+    def strict_word(self, word):
+        """同 word()，规范化会改变词义时抛出 ValueError (规则的原子词使用)"""
+        reason = self.lossy(word)
+        if reason is not None: raise ValueError(f"{word} {reason}")
+        return self.word(word)
+
+
+DEFAULT_NORMALIZER = Normalizer()
@@ -0,0 +1,288 @@
+import asyncio
+import functools
+import json
+import logging
+import time
+from collections import OrderedDict
+from aiogram.types import InlineKeyboardMarkup
+from redis.exceptions import ResponseError
+
+logger = logging.getLogger(__name__)
+
+GROUP = "dispatchers"  # dispatcher 进程共用的消费组
+
+# ==================================================================
+# 发件箱条目 (Redis Stream 字段，均为字符串):
+#   chat_id  推送目标
+#   text     消息正文
+#   opts     其余 send_message 参数 (JSON)，如 parse_mode / disable_web_page_preview
+#   markup   按钮 (InlineKeyboardMarkup 的 JSON)，没有按钮时为空
+#   ts       写入时间 (毫秒)
+# 死信流里的条目另有 error (放弃原因) 与 src (原条目 id)。
+# ==================================================================
+
+
+class OutboxWriter:
+    """worker 端: 渲染好的推送写入 Redis Stream，由 dispatcher.py 进程消费发送
+
+    与 core.dispatch.Dispatcher 接口相同 (submit / run / drain / prune / stats)，worker 按配置二选一。
+    submit 只做序列化并放入进程内缓冲，run 循环攒一小批后用 pipeline 批量 XADD；
+    Redis 暂时不可用时缓冲保留、稍后重试，缓冲超过 max_pending 时丢弃新推送。
+    on_sent 在条目写入 Stream 之后调用 (实际投递由 dispatcher 进程完成)。
+    maxlen 为 Stream 的近似长度上限，必须远大于积压量，否则未投递的条目会被裁掉。
+    """
+
+    def __init__(self, redis, stream, maxlen=200000, batch=200, interval=0.05, max_pending=10000, retry_delay=1.0):
+        self.redis = redis
+        self.stream = stream
+        self.maxlen = maxlen
+        self.batch = batch
+        self.interval = interval
+        self.max_pending = max_pending
+        self.retry_delay = retry_delay
+        self._buf = []  # [(字段, on_sent)]
+        self._markups = OrderedDict()  # id(markup) -> (markup, JSON)，同一条消息的订阅者共用键盘，只序列化一次
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def __len__(self):
+        return len(self._buf)
+
+    def _markup_json(self, markup):
+        if markup is None: return ""
+        key = id(markup)
+        hit = self._markups.get(key)
+        if hit is not None and hit[0] is markup:
+            self._markups.move_to_end(key)
+            return hit[1]
+        s = markup.model_dump_json(exclude_none=True)
+        self._markups[key] = (markup, s)
+        if len(self._markups) > 256: self._markups.popitem(last=False)
+        return s
+
+    def submit(self, chat_id, on_sent=None, text="", reply_markup=None, **opts):
+        """序列化后放入写入缓冲，缓冲已满返回 False"""
+        if len(self._buf) >= self.max_pending:
+            self.dropped += 1
+            return False
+        fields = {
+            "chat_id": str(chat_id),
+            "text": text,
+            "opts": json.dumps(opts),
+            "markup": self._markup_json(reply_markup),
+            "ts": str(int(time.time() * 1000)),
+        }
+        self._buf.append((fields, on_sent))
+        self._wakeup.set()
+        return True
+
+    async def flush(self):
+        """写入一批，成功 (或没有可写的) 返回 True"""
+        async with self._lock:
+            batch = self._buf[:self.batch]
+            if not batch: return True
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for fields, _ in batch: pipe.xadd(self.stream, fields, maxlen=self.maxlen, approximate=True)
+                    await pipe.execute()
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"⚠️ 发件箱写入失败，稍后重试 ({len(self._buf)} 条待写): {e}")
+                return False
+            del self._buf[:len(batch)]
+            self.written += len(batch)
+        for _, on_sent in batch:
+            if on_sent is not None: asyncio.create_task(on_sent())
+        return True
+
+    async def run(self):
+        while True:
+            if not self._buf:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                # 攒一小批再写，减少往返
+                await asyncio.sleep(self.interval)
+            if not await self.flush(): await asyncio.sleep(self.retry_delay)
+
+    def prune(self):
+        pass
+
+    async def drain(self, timeout=10):
+        """退出前把缓冲全部写入，返回写不进去的条数"""
+        deadline = time.monotonic() + timeout
+        while self._buf and time.monotonic() < deadline:
+            if not await self.flush(): await asyncio.sleep(self.retry_delay)
+        return len(self._buf)
+
+    def stats(self):
+        return {
+            "outbox": self.stream,
+            "pending": len(self._buf),
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+class OutboxConsumer:
+    """dispatcher 端: 以消费组读取发件箱，交给本进程的 Dispatcher 按限速发送
+
+    发送成功后 XACK；放弃发送 (对方屏蔽机器人、请求无效、重试耗尽) 的条目写入死信流后 XACK。
+    本地队列超过 low_water 时暂停读取，积压留在 Stream 里由其它 dispatcher 进程分担。
+    进程退出或崩溃时已读未确认的条目留在消费组的待处理列表 (PEL) 里:
+      - 同名消费者重启后先从 0 读回自己名下的待处理条目；
+      - 各消费者定期认领空闲超过 claim_idle 秒的他人条目 (XPENDING + XCLAIM)，
+        投递次数达到 max_deliveries 的直接转入死信流，避免同一条坏消息反复拖垮进程；
+      - 本进程仍在排队的条目定期用 XCLAIM JUSTID 刷新空闲时间，不会被别的消费者抢走重发。
+    """
+
+    def __init__(self, redis, stream, dispatcher, consumer, group=GROUP, dead=None, batch=100, block=1000,
+                 low_water=1000, claim_idle=300, claim_interval=30, max_deliveries=5, dead_maxlen=100000):
+        self.redis = redis
+        self.stream = stream
+        self.dispatcher = dispatcher
+        self.consumer = consumer
+        self.group = group
+        self.dead = dead or f"{stream}:dead"
+        self.batch = batch
+        self.block = block
+        self.low_water = low_water
+        self.claim_idle = claim_idle
+        self.claim_interval = claim_interval
+        self.max_deliveries = max_deliveries
+        self.dead_maxlen = dead_maxlen
+        self._local = set()  # 已交给 Dispatcher、尚未确认的条目 id
+        self._stopped = False
+        self.received = 0
+        self.acked = 0
+        self.claimed = 0
+        self.dead_lettered = 0
+        self.lost = 0  # 认领时发现已被 MAXLEN 裁掉的条目
+
+    async def ensure_group(self):
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e): raise
+
+    def _submit(self, entry_id, fields):
+        if entry_id in self._local: return
+        try:
+            chat_id = int(fields["chat_id"])
+            opts = json.loads(fields.get("opts") or "{}")
+            markup = fields.get("markup")
+            if markup: opts["reply_markup"] = InlineKeyboardMarkup.model_validate_json(markup)
+        except Exception as e:
+            asyncio.create_task(self._dead_letter(entry_id, fields, e))
+            return
+        ok = self.dispatcher.submit(
+            chat_id,
+            on_sent=functools.partial(self._ack, entry_id),
+            on_failed=functools.partial(self._dead_letter, entry_id, fields),
+            text=fields.get("text", ""), **opts,
+        )
+        # 本地队列满时不确认，留在 PEL 里等待认领
+        if ok: self._local.add(entry_id)
+
+    async def _ack(self, entry_id):
+        self._local.discard(entry_id)
+        await self.redis.xack(self.stream, self.group, entry_id)
+        self.acked += 1
+
+    async def _dead_letter(self, entry_id, fields, error):
+        self._local.discard(entry_id)
+        await self.redis.xadd(self.dead, dict(fields, error=str(error)[:500], src=entry_id), maxlen=self.dead_maxlen, approximate=True)
+        await self.redis.xack(self.stream, self.group, entry_id)
+        self.dead_lettered += 1
+
+    async def _read(self, start, block=None):
+        resp = await self.redis.xreadgroup(self.group, self.consumer, {self.stream: start}, count=self.batch, block=block)
+        entries = resp[0][1] if resp else []
+        for entry_id, fields in entries:
+            # 从 0 读取自己的 PEL 时，已被裁掉的条目字段为空
+            if not fields:
+                await self.redis.xack(self.stream, self.group, entry_id)
+                self.lost += 1
+                continue
+            self.received += 1
+            self._submit(entry_id, fields)
+        return entries
+
+    async def reclaim(self):
+        """认领长时间未确认的条目 (原消费者已崩溃或下线)"""
+        idle_ms = int(self.claim_idle * 1000)
+        pending = await self.redis.xpending_range(self.stream, self.group, min="-", max="+", count=self.batch, idle=idle_ms)
+        retry, dead = [], []
+        for p in pending:
+            entry_id = p["message_id"]
+            if entry_id in self._local: continue
+            (dead if p["times_delivered"] >= self.max_deliveries else retry).append(entry_id)
+        for ids, give_up in ((retry, False), (dead, True)):
+            if not ids: continue
+            claimed = await self.redis.xclaim(self.stream, self.group, self.consumer, idle_ms, ids)
+            got = set()
+            for entry_id, fields in claimed:
+                if not fields: continue
+                got.add(entry_id)
+                self.claimed += 1
+                if give_up: await self._dead_letter(entry_id, fields, f"投递 {self.max_deliveries} 次仍未确认")
+                else: self._submit(entry_id, fields)
+            # 已被 MAXLEN 裁掉的条目无法再投递，从 PEL 中清除
+            missing = [i for i in ids if i not in got]
+            if missing:
+                await self.redis.xack(self.stream, self.group, *missing)
+                self.lost += len(missing)
+
+    async def heartbeat(self):
+        """刷新本进程仍在排队的条目的空闲时间 (JUSTID 不增加投递次数)"""
+        ids = list(self._local)
+        for i in range(0, len(ids), 500):
+            await self.redis.xclaim(self.stream, self.group, self.consumer, 0, ids[i:i + 500], justid=True)
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(self.claim_interval)
+            try:
+                await self.heartbeat()
+                await self.reclaim()
+            except Exception as e:
+                logger.error(f"发件箱认领失败: {e}")
+
+    async def run(self):
+        await self.ensure_group()
+        # 先读回自己名下未确认的条目 (上次退出时还没发完的)
+        start = "0"
+        while True:
+            entries = await self._read(start)
+            if not entries: break
+            start = entries[-1][0]
+        maintainer = asyncio.create_task(self._maintain())
+        try:
+            while not self._stopped:
+                if len(self.dispatcher) >= self.low_water:
+                    await asyncio.sleep(0.1)
+                    continue
+                try:
+                    await self._read(">", self.block)
+                except Exception as e:
+                    logger.error(f"发件箱读取失败: {e}")
+                    await asyncio.sleep(1)
+        finally:
+            maintainer.cancel()
+
+    def stop(self):
+        """停止读取新条目 (最多等待一次 block)，已读到的仍交给 Dispatcher 发送"""
+        self._stopped = True
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "acked": self.acked,
+            "in_flight": len(self._local),
+            "claimed": self.claimed,
+            "dead_lettered": self.dead_lettered,
+            "lost": self.lost,
+        }
@@ -0,0 +1,33 @@
+"""用户正则的隔离执行进程，由 core.matcher.RegexSet 启动
+
+标准输入第一行为各批正则 [[合并后的正则或 null, [正则...]], ...]，编译完成后输出一行 ready；
+之后每行一条消息 [起始批次, 文本]，从起始批次开始每扫描完一批输出一行该批的命中 [[批内序号, 起点, 终点], ...]
+(父进程在某批超时重启本进程后，从中断处接着扫描)。
+回溯失控的正则只会卡住本进程，由父进程按超时杀掉，不影响事件循环。
+"""
+import json
+import re
+import sys
+
+
+def main():
+    batches = []
+    for combined, patterns in json.loads(sys.stdin.readline()):
+        batches.append((re.compile(combined) if combined else None, [re.compile(p) for p in patterns]))
+    out = sys.stdout
+    out.write("ready\n")
+    out.flush()
+    for line in sys.stdin:
+        start, text = json.loads(line)
+        for combined, rxs in batches[start:]:
+            hits = []
+            if combined is None or combined.search(text):
+                for i, rx in enumerate(rxs):
+                    m = rx.search(text)
+                    if m: hits.append((i, m.start(), m.end()))
+            out.write(json.dumps(hits) + "\n")
+            out.flush()
+
+
+if __name__ == "__main__":
+    main()
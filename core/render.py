@@ -0,0 +1,113 @@
+import html
+import time
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+BJ_OFFSET = 8 * 3600  # 推送里的时间按北京时间显示
+MAX_TAGS = 100000  # 转义后关键词标签的缓存上限，超出后整体清空
+
+HEADER = "<b>监听关键词</b>\n🎯 <b>命中关键词：</b>"
+HEADER_EDITED = "<b>监听关键词 (消息已编辑)</b>\n🎯 <b>命中关键词：</b>"
+
+
+def escape(s):
+    return html.escape(s, quote=False)
+
+
+class RenderedMessage:
+    """一条消息的渲染结果: 正文与按钮只生成一次，各订阅者只拼接自己的命中词
+
+    键盘按精简/普通两种各生成一次，所有订阅者共用同一个对象 (发送时只读)。
+    """
+
+    __slots__ = ("renderer", "header", "body", "link", "title", "name", "short", "fixed", "_kb")
+
+    def __init__(self, renderer, header, body, link, title, name, short, fixed):
+        self.renderer = renderer
+        self.header = header
+        self.body = body
+        self.link = link
+        self.title = title
+        self.name = name
+        self.short = short
+        self.fixed = fixed
+        self._kb = [None, None]  # 普通模式 / 精简模式
+
+    def text(self, words):
+        return f"{self.header}{self.renderer.tags(words)}\n\n{self.body}"
+
+    def keyboard(self, simple):
+        i = 1 if simple else 0
+        kb = self._kb[i]
+        if kb is None:
+            rows = self.fixed if simple else self.renderer.ads + self.fixed
+            kb = self._kb[i] = InlineKeyboardMarkup(inline_keyboard=rows)
+        return kb
+
+    def digest_line(self, words):
+        """合并推送 / 摘要中的一行"""
+        return f"{self.renderer.tags(words)} <a href='{self.link}'>{self.title}</a> {self.name}: {self.short}"
+
+
+class NotifyRenderer:
+    """推送消息渲染器，广告按钮 (system_settings.btn_ad_*) 变化时整体重建
+
+    广告按钮行、关闭按钮以及不带消息定位/拉黑按钮的键盘在构造时生成；
+    每条消息的用户字段只转义一次 (RenderedMessage)，时间字符串按秒缓存，
+    关键词标签转义后缓存，逐个订阅者时不再创建按钮对象、也不重复转义。
+    """
+
+    def __init__(self, ads=()):
+        self.ads = [list(row) for row in ads]
+        self.close_row = [InlineKeyboardButton(text="❌ 关闭", callback_data="menu_monitor")]
+        self._static = (
+            InlineKeyboardMarkup(inline_keyboard=self.ads + [self.close_row]),
+            InlineKeyboardMarkup(inline_keyboard=[self.close_row]),
+        )
+        self._tags = {}  # 关键词 -> "#关键词" (已转义)
+        self._clock = (None, "")
+
+    def now_str(self, now=None):
+        sec = int(time.time() if now is None else now)
+        if sec != self._clock[0]:
+            self._clock = (sec, time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(sec + BJ_OFFSET)))
+        return self._clock[1]
+
+    def tags(self, words):
+        cache = self._tags
+        out = []
+        for w in words:
+            t = cache.get(w)
+            if t is None:
+                if len(cache) >= MAX_TAGS: cache.clear()
+                t = cache[w] = "#" + escape(w)
+            out.append(t)
+        return " ".join(out)
+
+    def message(self, user_id, user_name, username, title, url, history, snippet, content, has_link=True, edited=False):
+        """渲染一条消息的公共部分；history 为已是 HTML 的历史链接，其余字段在这里转义
+
+        url 为消息链接 (没有链接的群为提示文字)，has_link 为 True 时附带消息定位按钮
+        """
+        link = html.escape(url)
+        title, name = escape(title), escape(user_name)
+        body = (
+            f"用户ID：<code>{user_id}</code>\n"
+            f"用户昵称：{name}\n"
+            f"用户名：{escape(username)}\n"
+            f"来自于：<a href='{link}'>{title}</a>\n"
+            f"用户历史搜索：{history}\n"
+            f"捕捉时间：{self.now_str()}\n"
+            f"发送内容：{escape(snippet)}"
+        )
+        view = RenderedMessage(self, HEADER_EDITED if edited else HEADER, body, link, title, name, escape(content[:100]), None)
+        if not has_link and not user_id:
+            # 没有消息链接、也不知道发送者时按钮都是固定的，直接用预先生成的键盘
+            view._kb = list(self._static)
+            return view
+        fixed = []
+        if has_link: fixed.append([InlineKeyboardButton(text="🧐 消息定位 🧐", url=url)])
+        row = self.close_row
+        if user_id: row = row + [InlineKeyboardButton(text="🔊 拉黑ID", callback_data=f"ban_target:{user_id}")]
+        fixed.append(row)
+        view.fixed = fixed
+        return view
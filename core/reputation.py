@@ -0,0 +1,153 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+OK, DEMOTE, DROP = 0, 1, 2
+CHAT_BITS = 64  # 每个发送者的群组位图宽度 (线性计数，估计 64 个以内的不同群)
+
+
+def _decay(value, dt, tau):
+    return value * math.exp(-dt / tau) if dt > 0 else value
+
+
+def _distinct(bits):
+    """线性计数: 由位图中 0 的比例估计不同元素个数"""
+    zeros = CHAT_BITS - bin(bits).count("1")
+    if zeros == 0: return CHAT_BITS * 4
+    return CHAT_BITS * math.log(CHAT_BITS / zeros)
+
+
+class SenderStats:
+    __slots__ = ("ts", "rate", "spam", "scored", "chats", "prev_chats", "window")
+
+    def __init__(self, now, window):
+        self.ts = now
+        self.rate = 0.0  # 指数衰减的消息数 (时间常数 rate_tau)，约等于每 rate_tau 秒的条数
+        self.spam = 0.0  # 指数衰减的广告判定次数
+        self.scored = 0.0  # 指数衰减的评分次数
+        self.chats = 0  # 当前时间片内出现过的群 (位图)
+        self.prev_chats = 0  # 上一时间片
+        self.window = window  # 当前时间片编号
+
+
+class SenderReputation:
+    """发送者信誉: 全网发言速率、跨群数量、广告评分历史、被拉黑次数
+
+    每个发送者只存几个衰减计数和两张 64 位群组位图 (相邻两个时间片，交替清空)，
+    按 LRU 最多保留 maxsize 个发送者。超过降级阈值的发送者改为摘要推送，
+    超过丢弃阈值的在查找收件人之前直接丢弃。
+    配置了 redis 时，各 worker 定期把本地判定为丢弃的发送者写入共享的有序集合
+    (分数为过期时间)，并读取其它 worker 的判定结果。
+    """
+
+    def __init__(self, demote_rate=10, drop_rate=30, max_chats=20, reports=3, maxsize=200000,
+                 rate_tau=60, spam_tau=3600, chat_window=600, redis=None, key="reputation:flagged", flag_ttl=600):
+        self.demote_rate = demote_rate
+        self.drop_rate = drop_rate
+        self.max_chats = max_chats
+        self.reports = reports
+        self.maxsize = maxsize
+        self.rate_tau = rate_tau
+        self.spam_tau = spam_tau
+        self.chat_window = chat_window
+        self.redis = redis
+        self.key = key
+        self.flag_ttl = flag_ttl
+        self._stats = OrderedDict()  # sender_id -> SenderStats
+        self._reported = {}  # sender_id -> 拉黑该发送者的用户数
+        self._remote = frozenset()  # 其它 worker 判定为丢弃的发送者
+        self._flagged = {}  # 本地判定为丢弃的发送者 -> 时间，等待写入 redis
+        self.demoted = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._stats)
+
+    def _get(self, sender_id, now):
+        stats = self._stats
+        s = stats.get(sender_id)
+        window = int(now // self.chat_window)
+        if s is None:
+            s = stats[sender_id] = SenderStats(now, window)
+            if len(stats) > self.maxsize: stats.popitem(last=False)
+            return s
+        stats.move_to_end(sender_id)
+        if window != s.window:
+            s.prev_chats = s.chats if window == s.window + 1 else 0
+            s.chats = 0
+            s.window = window
+        dt = now - s.ts
+        s.rate = _decay(s.rate, dt, self.rate_tau)
+        s.spam = _decay(s.spam, dt, self.spam_tau)
+        s.scored = _decay(s.scored, dt, self.spam_tau)
+        s.ts = now
+        return s
+
+    def observe(self, sender_id, chat_id, now=None):
+        """记录一条发言，返回当前判定 (OK / DEMOTE / DROP)"""
+        now = time.time() if now is None else now
+        s = self._get(sender_id, now)
+        s.rate += 1
+        s.chats |= 1 << (hash(chat_id) % CHAT_BITS)
+        verdict = self._verdict(sender_id, s, now)
+        if verdict == DROP: self.dropped += 1
+        elif verdict == DEMOTE: self.demoted += 1
+        return verdict
+
+    def check(self, sender_id, now=None):
+        """只返回当前判定，不计入发言 (编辑消息用，避免反复编辑把速率刷高)"""
+        now = time.time() if now is None else now
+        s = self._stats.get(sender_id)
+        if s is None:
+            if sender_id in self._remote: return DROP
+            return DEMOTE if self._reported.get(sender_id, 0) >= self.reports else OK
+        return self._verdict(sender_id, self._get(sender_id, now), now)
+
+    def record_spam(self, sender_id, is_spam, now=None):
+        now = time.time() if now is None else now
+        s = self._get(sender_id, now)
+        s.scored += 1
+        if is_spam: s.spam += 1
+
+    def set_reports(self, reported):
+        """{发送者 tg_id: 拉黑他的用户数}，由数据库中的 user_blacklist 汇总而来"""
+        self._reported = reported
+
+    def _verdict(self, sender_id, s, now):
+        per_minute = s.rate * 60 / self.rate_tau
+        spam_ratio = s.spam / s.scored if s.scored >= 3 else 0.0
+        if per_minute >= self.drop_rate or spam_ratio >= 0.8:
+            # 只发布本地判定的结果，避免各 worker 互相续期
+            if sender_id not in self._flagged: self._flagged[sender_id] = now
+            return DROP
+        if sender_id in self._remote: return DROP
+        if (per_minute >= self.demote_rate or spam_ratio >= 0.5
+                or _distinct(s.chats | s.prev_chats) >= self.max_chats
+                or self._reported.get(sender_id, 0) >= self.reports):
+            return DEMOTE
+        return OK
+
+    async def sync(self):
+        """与其它 worker 交换丢弃名单 (未配置 redis 时只清理本地名单)"""
+        now = time.time()
+        flagged, self._flagged = self._flagged, {}
+        if self.redis is None: return
+        try:
+            if flagged: await self.redis.zadd(self.key, {str(uid): ts + self.flag_ttl for uid, ts in flagged.items()})
+            await self.redis.zremrangebyscore(self.key, "-inf", now)
+            members = await self.redis.zrangebyscore(self.key, now, "+inf")
+            self._remote = frozenset(int(m) for m in members)
+        except Exception as e:
+            logger.debug(f"信誉 redis 异常: {e}")
+
+    def stats(self):
+        return {
+            "senders": len(self._stats),
+            "demoted": self.demoted,
+            "dropped": self.dropped,
+            "remote_flagged": len(self._remote),
+            "reported": len(self._reported),
+        }
@@ -0,0 +1,159 @@
+import re
+
+# ==================================================================
+# 关键词规则 (keywords.match_mode = 'rule'，规则文本存在 word 字段)
+# ==================================================================
+# 语法:
+#   USDT AND 出售 NOT 回收      与 / 非 (相邻两项默认是 AND)
+#   能量 OR 租赁                或
+#   USDT NEAR/10 出售           两个词在原文中间隔不超过 10 个字符 (含空格标点，两侧必须是单个词)
+#   (USDT OR 泰达币) 出售       括号分组；带空格的词用 "双引号"
+# 优先级: NOT > NEAR > AND > OR
+# 运算符必须大写，小写的 and / or / not 是普通词 (如 rock and roll、do not disturb)；
+# 输入里没有运算符时按普通关键词保存，单独的括号 (如 USDT(TRC20)) 不算规则。
+# 规则至少要有一个正向词，只有其中某个词在消息中出现时才会被求值。
+
+MAX_RULE_LEN = 200
+MAX_RULE_ATOMS = 20
+
+OP_ATOM, OP_NOT, OP_AND, OP_OR, OP_NEAR = range(5)
+
+_TOKEN = re.compile(r'\(|\)|"[^"]*"|[^\s()"]+')
+_NEAR = re.compile(r"NEAR/(\d+)$")
+_KEYWORDS = ("AND", "OR", "NOT")
+
+
+def looks_like_rule(text):
+    """用户输入是否使用了规则语法 (含大写的 AND / OR / NOT / NEAR/n)"""
+    for tok in _TOKEN.findall(text):
+        if tok in _KEYWORDS or _NEAR.match(tok): return True
+    return False
+
+
+class Rule:
+    """编译后的规则: 原子词列表 + 后缀求值程序"""
+
+    __slots__ = ("text", "atoms", "program")
+
+    def __init__(self, text, atoms, program):
+        self.text = text
+        self.atoms = atoms
+        self.program = program
+
+    def evaluate(self, positions):
+        """positions: 原子词 -> [(原文起点, 原文终点)...] (终点含)，未出现的词不在字典里"""
+        stack = []
+        push, pop = stack.append, stack.pop
+        for op in self.program:
+            code = op[0]
+            if code == OP_ATOM:
+                push(op[1] in positions)
+            elif code == OP_NOT:
+                push(not pop())
+            elif code == OP_AND:
+                b = pop()
+                push(pop() and b)
+            elif code == OP_OR:
+                b = pop()
+                push(pop() or b)
+            else:
+                push(_near(positions.get(op[1]), positions.get(op[2]), op[3]))
+        return stack[0]
+
+
+def _near(spans_a, spans_b, dist):
+    if not spans_a or not spans_b: return False
+    for sa, ea in spans_a:
+        for sb, eb in spans_b:
+            # 两段之间的字符数，重叠时为负
+            if max(sa, sb) - min(ea, eb) - 1 <= dist: return True
+    return False
+
+
+class _Parser:
+    def __init__(self, text, transform=None):
+        self.transform = transform
+        self.tokens = _TOKEN.findall(text)
+        self.pos = 0
+        self.program = []
+        self.atoms = {}
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        tok = self.peek()
+        self.pos += 1
+        return tok
+
+    def parse(self):
+        if not self.tokens: raise ValueError("规则为空")
+        self.or_expr()
+        if self.peek() is not None: raise ValueError(f"无法解析: {self.peek()}")
+        return self.program
+
+    def or_expr(self):
+        self.and_expr()
+        while self.peek() == "OR":
+            self.take()
+            self.and_expr()
+            self.program.append((OP_OR,))
+
+    def and_expr(self):
+        self.near_expr()
+        while True:
+            tok = self.peek()
+            if tok is None or tok == ")" or tok == "OR": return
+            if tok == "AND": self.take()
+            self.near_expr()
+            self.program.append((OP_AND,))
+
+    def near_expr(self):
+        left = self.unary()
+        tok = self.peek()
+        m = _NEAR.match(tok) if tok else None
+        if not m: return
+        self.take()
+        right = self.unary()
+        if left is None or right is None: raise ValueError("NEAR 两侧必须是单个词")
+        # 撤销两个原子的压栈指令，换成一条 NEAR 指令
+        del self.program[-2:]
+        self.program.append((OP_NEAR, left, right, int(m.group(1))))
+
+    def unary(self):
+        """返回单个原子词 (供 NEAR 使用)，复合表达式返回 None"""
+        tok = self.peek()
+        if tok is None: raise ValueError("规则不完整")
+        if tok == "NOT":
+            self.take()
+            self.unary()
+            self.program.append((OP_NOT,))
+            return None
+        if tok == "(":
+            self.take()
+            self.or_expr()
+            if self.take() != ")": raise ValueError("括号不匹配")
+            return None
+        if tok == ")" or tok in _KEYWORDS or _NEAR.match(tok):
+            raise ValueError(f"位置错误: {tok}")
+        self.take()
+        word = tok[1:-1] if tok.startswith('"') else tok
+        if self.transform: word = self.transform(word)
+        if not word: raise ValueError("空词")
+        self.atoms[word] = None
+        self.program.append((OP_ATOM, word))
+        return word
+
+
+def compile_rule(text, transform=None):
+    """编译规则文本，语法错误抛出 ValueError；transform 用于规范化原子词"""
+    text = (text or "").strip()
+    if len(text) > MAX_RULE_LEN: raise ValueError("规则过长")
+    parser = _Parser(text, transform)
+    program = parser.parse()
+    atoms = list(parser.atoms)
+    if len(atoms) > MAX_RULE_ATOMS: raise ValueError(f"规则最多 {MAX_RULE_ATOMS} 个词")
+    rule = Rule(text, atoms, tuple(program))
+    # 没有任何词出现也能成立的规则 (如 NOT 回收) 会对每条消息生效，拒绝
+    if rule.evaluate({}): raise ValueError("规则至少需要一个必须出现的词")
+    return rule
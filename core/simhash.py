@@ -0,0 +1,133 @@
+import time
+from collections import deque
+from itertools import combinations
+
+MASK64 = (1 << 64) - 1
+SHINGLE = 2  # 字符 n-gram 长度 (中文以双字为词的居多，2-gram 下改一个字只影响两个特征)
+MAX_FEATURES = 512  # 每条消息最多取多少个 n-gram
+LANE_BITS = 16  # 每个比特位计数器占用的宽度 (计数上限 65535)
+# 按文本长度分档的海明距离阈值 (长度上限, 阈值)：特征越少，改一个字对指纹的扰动越大，
+# 短文本需要放宽；随机 64 位指纹距离 <= 12 的概率不到百万分之一，不会把无关内容并到一起
+DISTANCE_BY_LENGTH = ((40, 12), (80, 10))
+
+
+def _build_lane_tables():
+    # 把 8 个比特展开成 8 个 16 位计数槽位，按字节位置预先移好位，
+    # 这样一个 64 位哈希只需 8 次查表即可完成 64 个计数器的累加
+    base = []
+    for b in range(256):
+        v = 0
+        for k in range(8):
+            if b >> k & 1: v |= 1 << (k * LANE_BITS)
+        base.append(v)
+    return [[v << (j * 8 * LANE_BITS) for v in base] for j in range(8)]
+
+
+_LANES = _build_lane_tables()
+_LANE_MASK = (1 << LANE_BITS) - 1
+
+
+def simhash(text):
+    """64 位 SimHash，特征为字符 2-gram (传入规范化后的文本效果更好)"""
+    n = len(text) - SHINGLE + 1
+    if n <= 0: return hash(text) & MASK64
+    n = min(n, MAX_FEATURES)
+    t0, t1, t2, t3, t4, t5, t6, t7 = _LANES
+    counts = 0
+    for i in range(n):
+        h = hash(text[i:i + SHINGLE]) & MASK64
+        counts += (t0[h & 255] | t1[h >> 8 & 255] | t2[h >> 16 & 255] | t3[h >> 24 & 255]
+                   | t4[h >> 32 & 255] | t5[h >> 40 & 255] | t6[h >> 48 & 255] | t7[h >> 56])
+    fp = 0
+    half = n / 2
+    for bit in range(64):
+        if (counts >> (bit * LANE_BITS) & _LANE_MASK) > half: fp |= 1 << bit
+    return fp
+
+
+def distance_for(length, default=8):
+    """长度为 length 的文本判为近似重复所允许的最大海明距离"""
+    for limit, distance in DISTANCE_BY_LENGTH:
+        if length < limit: return distance
+    return default
+
+
+class NearDupEntry:
+    __slots__ = ("fp", "ts", "notified")
+
+    def __init__(self, fp, ts):
+        self.fp = fp
+        self.ts = ts
+        self.notified = set()  # 本窗口内已收到过该内容的订阅者
+
+
+class NearDupIndex:
+    """近似重复内容索引
+
+    64 位指纹切成 bands 段，按段查候选，再用海明距离确认；
+    海明距离 <= d 的两个指纹必然有一段最多相差 d // bands 位，查找时把每段在这个半径内的取值都探一遍，
+    因此不会漏判。传入 length 时按文本长度取阈值 (见 distance_for)，否则用 max_distance。
+    只保留 window 秒内、最多 maxsize 条记录，超出从最旧的开始淘汰。
+    """
+
+    def __init__(self, window=600, maxsize=20000, max_distance=8, bands=7):
+        self.window = window
+        self.maxsize = maxsize
+        self.max_distance = max_distance
+        self.bands = bands
+        self.band_bits = 64 // bands
+        self._band_mask = (1 << self.band_bits) - 1
+        self._buckets = [{} for _ in range(bands)]
+        self._entries = deque()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _keys(self, fp):
+        bits, mask = self.band_bits, self._band_mask
+        return [fp >> (i * bits) & mask for i in range(self.bands)]
+
+    def _probes(self, key, radius):
+        yield key
+        if radius < 1: return
+        flips = [1 << b for b in range(self.band_bits)]
+        for k in range(1, radius + 1):
+            for combo in combinations(flips, k):
+                yield key ^ sum(combo)
+
+    def _expire(self, now):
+        entries = self._entries
+        while entries and (len(entries) > self.maxsize or now - entries[0].ts >= self.window):
+            old = entries.popleft()
+            for bucket, key in zip(self._buckets, self._keys(old.fp)):
+                lst = bucket.get(key)
+                if lst is None: continue
+                try: lst.remove(old)
+                except ValueError: pass
+                if not lst: del bucket[key]
+
+    def entry_for(self, fp, now=None, length=None):
+        """返回窗口内与 fp 近似的已有记录；没有则新建一条"""
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        keys = self._keys(fp)
+        max_distance = self.max_distance if length is None else distance_for(length, self.max_distance)
+        radius = max_distance // self.bands
+        for bucket, key in zip(self._buckets, keys):
+            for probe in self._probes(key, radius):
+                for entry in bucket.get(probe, ()):
+                    if (entry.fp ^ fp).bit_count() <= max_distance:
+                        self.hits += 1
+                        return entry
+        self.misses += 1
+        entry = NearDupEntry(fp, now)
+        self._entries.append(entry)
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, []).append(entry)
+        self._expire(now)
+        return entry
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
@@ -0,0 +1,151 @@
+import gc
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from core.matcher import MatchEngine, OwnedMatcher
+from core.subscribers import SubscriberTable
+
+# ==================================================================
+# 配置快照文件
+# ==================================================================
+# 布局 (小端):
+#   文件头   magic(8) | 格式版本 u32 | 段数 u32
+#   段目录   每段: 名称(16) | 类型(1) | 填充(7) | 偏移 u64 | 字节数 u64
+#   数据段   按 8 字节对齐依次存放
+# 段类型: 'i'/'q' 为 int32/int64 数组，加载时直接在 mmap 上 cast 成 memoryview，不做拷贝；
+#         's' 为 \0 分隔的 UTF-8 字符串列表；'j' 为 JSON 元信息。
+# 自动机等数据结构在加载后按需展开 (见 core.matcher.LazyRows)，因此启动耗时与词表大小基本无关。
+# 数组布局或编码方式有任何变化都必须提升 FORMAT_VERSION，旧快照会被拒绝并回退到全量加载。
+
+MAGIC = b"TGKWSNAP"
+FORMAT_VERSION = 4
+_HEADER = struct.Struct("<8sII")
+_SECTION = struct.Struct("<16sc7xQQ")
+
+
+def write_snapshot(path, meta, arrays, strings):
+    """写入快照: 先写临时文件再原子替换，正在 mmap 旧文件的进程不受影响"""
+    meta = dict(meta, counts={name: len(items) for name, items in strings.items()})
+    sections = [("meta", b"j", json.dumps(meta, ensure_ascii=False).encode("utf-8"))]
+    for name, items in strings.items():
+        if any("\0" in s for s in items): raise ValueError(f"字符串段 {name} 含有 \\0")
+        sections.append((name, b"s", "\0".join(items).encode("utf-8")))
+    for name, arr in arrays.items():
+        sections.append((name, arr.typecode.encode(), arr.tobytes()))
+
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    table = []
+    for name, code, data in sections:
+        offset += -offset % 8
+        table.append(_SECTION.pack(name.encode(), code, offset, len(data)))
+        offset += len(data)
+
+    dirname = os.path.dirname(path)
+    if dirname: os.makedirs(dirname, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(sections)))
+        for entry in table: f.write(entry)
+        for (_, _, data), entry in zip(sections, table):
+            f.seek(_SECTION.unpack(entry)[2])
+            f.write(data)
+        f.truncate(offset)  # 末尾的空段也要落在文件范围内
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Snapshot:
+    """只读打开的快照文件；数组段是 mmap 上的 memoryview，文件在对象存活期间保持映射"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mm)
+        magic, version, count = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC: raise ValueError("不是配置快照文件")
+        if version != FORMAT_VERSION: raise ValueError(f"快照格式版本 {version} 与当前版本 {FORMAT_VERSION} 不一致")
+        self._sections = {}
+        for i in range(count):
+            name, code, offset, size = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+            if offset + size > len(view): raise ValueError("快照文件不完整")
+            self._sections[name.rstrip(b"\0").decode()] = (code.decode(), view[offset:offset + size])
+        self.meta = json.loads(bytes(self._sections["meta"][1]))
+
+    def array(self, name):
+        code, data = self._sections[name]
+        return data.cast(code)
+
+    def arrays(self, prefix):
+        """名称以 prefix 开头的全部数组段，键去掉前缀"""
+        n = len(prefix)
+        return {name[n:]: self.array(name) for name in self._sections if name.startswith(prefix)}
+
+    def strings(self, name):
+        if not self.meta["counts"][name]: return []
+        items = bytes(self._sections[name][1]).decode("utf-8").split("\0")
+        if len(items) != self.meta["counts"][name]: raise ValueError(f"字符串段 {name} 数量不符")
+        return items
+
+
+def dump_config(path, table, filter_cache, engine, filter_index, normalizer):
+    """把订阅者表、过滤词与两个编译好的匹配器写入快照
+
+    engine 必须由 table 当前的关键词键编译而来 (调用方持有 SYNC_LOCK)，否则抛出 KeyError。
+    """
+    keys, arrays, strings = table.to_arrays()
+    key_index = {k: i for i, k in enumerate(keys)}
+    arrays.update((f"e.{k}", v) for k, v in engine.to_arrays(key_index).items())
+    arrays.update((f"f.{k}", v) for k, v in filter_index.to_arrays().items())
+    fuid, fraw = array("q"), []
+    for uid, words in filter_cache.items():
+        for w in words:
+            fuid.append(uid)
+            fraw.append(w)
+    arrays["fuid"] = fuid
+    strings.update({
+        "kmode": [k[0] for k in keys],
+        "kword": [k[1] for k in keys],
+        "ewords": engine.matcher.words,
+        "fwords": filter_index.matcher.words,
+        "fraw": fraw,
+    })
+    meta = {
+        "created": int(time.time()),
+        "normalizer": normalizer.fingerprint(),
+        "keywords": len(keys),
+        "subscribers": len(table),
+    }
+    write_snapshot(path, meta, arrays, strings)
+    return meta
+
+
+def load_config(path, normalizer):
+    """读取快照，返回 (订阅者表, 过滤词缓存, 匹配引擎, 过滤词索引, 元信息)"""
+    snap = Snapshot(path)
+    if snap.meta.get("normalizer") != normalizer.fingerprint(): raise ValueError("规范化规则已变化")
+    # 一次性创建大量无环的小对象，期间暂停分代 GC，否则会被反复触发 (约占加载耗时的 40%)
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _load_config(snap, normalizer)
+    finally:
+        if enabled: gc.enable()
+
+
+def _load_config(snap, normalizer):
+    # 键在表、引擎与订阅者之间共用同一个元组；模式只有几种，统一 intern
+    modes = {}
+    keys = [(modes.setdefault(m, sys.intern(m)), w) for m, w in zip(snap.strings("kmode"), snap.strings("kword"))]
+    names = ("subs", "widx", "wkey", "kidx", "ksid", "dbid", "ssid", "skey")
+    table = SubscriberTable.from_arrays(keys, {k: snap.array(k) for k in names}, snap.strings("scope"))
+    engine = MatchEngine.from_arrays(keys, snap.strings("ewords"), snap.arrays("e."), normalizer)
+    filter_index = OwnedMatcher.from_arrays(snap.strings("fwords"), snap.arrays("f."))
+    filter_cache = {}
+    for uid, w in zip(snap.array("fuid"), snap.strings("fraw")):
+        filter_cache.setdefault(uid, []).append(w)
+    return table, filter_cache, engine, filter_index, snap.meta
@@ -0,0 +1,108 @@
+import hashlib
+import re
+from bisect import bisect_right
+from collections import OrderedDict
+
+# 评分规则 (与旧版 is_spam_ai 一致)
+SPAM_WORDS = ["博彩", "首存", "网址", "点击链接", "刷单", "兼职", "AV", "裸聊"]
+EMOJI_RANGE = "[\U0001f600-\U0001f64f]"
+LINK_TOKENS = ["http", "t.me"]
+SPAM_THRESHOLD = 60
+
+
+class SpamScorer:
+    """广告评分器
+
+    表情、广告词、链接三类特征编译成一个正则，一次扫描得出分数；
+    结果按内容哈希缓存在有界 LRU 中，同一条广告被反复转发时不再重复计算。
+    """
+
+    def __init__(self, spam_words=SPAM_WORDS, cache_size=4096, threshold=SPAM_THRESHOLD):
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        words = "|".join(re.escape(w) for w in sorted(spam_words, key=len, reverse=True))
+        links = "|".join(re.escape(t) for t in LINK_TOKENS)
+        self._pattern = re.compile(f"(?P<e>{EMOJI_RANGE})|(?P<w>{words})|(?P<l>{links})")
+
+    @staticmethod
+    def _key(text):
+        return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    @staticmethod
+    def _rate(emoji, words, links):
+        score = 0
+        if emoji > 5: score += 30
+        if emoji > 10: score += 50
+        score += 40 * len(words)
+        if links > 3: score += 40
+        return score
+
+    def _compute(self, text):
+        emoji = links = 0
+        words = set()
+        for m in self._pattern.finditer(text):
+            kind = m.lastgroup
+            if kind == "e": emoji += 1
+            elif kind == "w": words.add(m.group())
+            else: links += 1
+        return self._rate(emoji, words, links)
+
+    def _remember(self, key, score):
+        cache = self._cache
+        cache[key] = score
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def score(self, text):
+        key = self._key(text)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+        score = self._compute(text)
+        self._remember(key, score)
+        return score
+
+    def is_spam(self, text):
+        return self.score(text) >= self.threshold
+
+    def score_batch(self, texts):
+        """批量评分 (补发/回放场景)
+
+        批内先去重并查缓存，未命中的文本拼接后只跑一次正则，再按偏移归还到各条。
+        """
+        keys = [self._key(t) for t in texts]
+        results = {}
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key in results or key in pending: continue
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                results[key] = cached
+            else:
+                pending[key] = text
+
+        if pending:
+            order = list(pending)
+            starts = []
+            pos = 0
+            for key in order:
+                starts.append(pos)
+                pos += len(pending[key]) + 1
+            # \x00 不会被任何特征匹配到，保证命中不会跨越两条文本
+            joined = "\x00".join(pending[key] for key in order)
+            stats = [[0, set(), 0] for _ in order]
+            for m in self._pattern.finditer(joined):
+                st = stats[bisect_right(starts, m.start()) - 1]
+                kind = m.lastgroup
+                if kind == "e": st[0] += 1
+                elif kind == "w": st[1].add(m.group())
+                else: st[2] += 1
+            for key, st in zip(order, stats):
+                score = self._rate(*st)
+                results[key] = score
+                self._remember(key, score)
+
+        return [results[key] for key in keys]
@@ -0,0 +1,218 @@
+import sys
+from array import array
+from core.matcher import DEFAULT_MODE
+
+
+class Subscriber:
+    """单个订阅者的推送配置，每个用户只存一份，所有关键词共享"""
+
+    __slots__ = ("sid", "uid", "paused", "simple", "target", "limit", "ai", "digest", "expire", "words", "scopes")
+
+    def __init__(self, sid, uid):
+        self.sid = sid
+        self.uid = uid
+        self.paused = False
+        self.simple = False
+        self.target = None
+        self.limit = 0
+        self.ai = False
+        self.digest = 0  # 合并推送窗口 (秒)，0 表示逐条推送
+        self.expire = None  # 会员到期时间 (unix 秒)，None 表示永久
+        self.words = set()  # {(match_mode, 关键词)}
+        self.scopes = None  # 限定了群组范围的关键词: 键 -> ChatScope，全网生效的词不占空间
+
+
+class ChatScope:
+    """单个订阅关键词的群组范围 (见 core.chatscope)；include 为 None 表示全网"""
+
+    __slots__ = ("include", "exclude")
+
+    def __init__(self, include=None, exclude=()):
+        self.include = frozenset(include) if include else None
+        self.exclude = frozenset(exclude)
+
+    def allows(self, refs):
+        if self.include is not None and self.include.isdisjoint(refs): return False
+        return self.exclude.isdisjoint(refs)
+
+    def encode(self):
+        """与 CONFIG_ROWS_SQL 中的写法一致: 排序后逗号拼接，包含/排除之间用 | 分隔"""
+        return f"{','.join(sorted(self.include or ()))}|{','.join(sorted(self.exclude))}"
+
+    @classmethod
+    def decode(cls, s):
+        include, _, exclude = s.partition("|")
+        return cls(include.split(",") if include else None, exclude.split(",") if exclude else ())
+
+
+class SubscriberTable:
+    """订阅者表
+
+    订阅者按小整数 sid 顺序存放，(match_mode, 关键词) -> array('i') 存 sid 列表，
+    关键词字符串统一 intern，同一个词在自动机、索引和订阅者之间只保留一份。
+
+    另按群维护订阅数: everywhere 为不限群的订阅数，chat_in 为只在某群生效的订阅数，
+    chat_ex 为排除了某群的不限群订阅 {(sid, 键)}。某个群一条可生效的订阅都没有时，
+    消息连扫描都不需要 (chat_eligible)。
+    """
+
+    def __init__(self):
+        self.subs = []  # sid -> Subscriber (已删除的位置为 None)
+        self.by_uid = {}  # tg_id -> sid
+        self.db_ids = {}  # users.id -> tg_id
+        self.keywords = {}  # (match_mode, 关键词) -> array('i') sid
+        self.everywhere = 0
+        self.chat_in = {}  # 群 -> 只在该群生效的订阅数
+        self.chat_ex = {}  # 群 -> {(sid, 键)}
+        self._free = []
+
+    def __len__(self):
+        return len(self.by_uid)
+
+    def get(self, uid):
+        sid = self.by_uid.get(uid)
+        return None if sid is None else self.subs[sid]
+
+    def upsert(self, r):
+        """按数据库行写入/更新订阅者配置，返回 Subscriber"""
+        uid = r['tg_id']
+        self.db_ids[r['user_db_id']] = uid
+        sid = self.by_uid.get(uid)
+        if sid is None:
+            sid = self._free.pop() if self._free else len(self.subs)
+            sub = Subscriber(sid, uid)
+            if sid == len(self.subs): self.subs.append(sub)
+            else: self.subs[sid] = sub
+            self.by_uid[uid] = sid
+        sub = self.subs[sid]
+        sub.paused = r['is_paused']
+        sub.simple = r['notify_simple_mode']
+        sub.target = r['notify_target_id']
+        sub.limit = r['fuzzy_limit'] or 0
+        sub.ai = r['ai_filter_enabled']
+        sub.digest = r['notify_digest_window'] or 0
+        sub.expire = r['expire_ts']
+        return sub
+
+    def add_keyword(self, sub, word, mode=DEFAULT_MODE, include=None, exclude=None):
+        """给订阅者挂一个关键词 (可限定群组范围)，该 (模式, 词) 为新出现的键时返回该键，否则返回 None"""
+        key = (sys.intern(mode or DEFAULT_MODE), sys.intern(word))
+        if key in sub.words: return None
+        sub.words.add(key)
+        scope = None
+        if include or exclude:
+            scope = ChatScope(include, exclude or ())
+            if sub.scopes is None: sub.scopes = {}
+            sub.scopes[key] = scope
+        self._track(sub.sid, key, scope, 1)
+        sids = self.keywords.get(key)
+        if sids is None:
+            self.keywords[key] = array('i', (sub.sid,))
+            return key
+        sids.append(sub.sid)
+        return None
+
+    def remove(self, uid):
+        """删除订阅者，返回因此不再有人订阅的关键词键列表"""
+        sid = self.by_uid.pop(uid, None)
+        if sid is None: return []
+        sub = self.subs[sid]
+        gone = []
+        scopes = sub.scopes or {}
+        for key in sub.words:
+            self._track(sid, key, scopes.get(key), -1)
+            sids = self.keywords.get(key)
+            if sids is None: continue
+            sids.remove(sid)
+            if not sids:
+                del self.keywords[key]
+                gone.append(key)
+        self.subs[sid] = None
+        self._free.append(sid)
+        return gone
+
+    def _track(self, sid, key, scope, delta):
+        """按群统计订阅数 (delta 为 +1 新增 / -1 删除)"""
+        if scope is None or scope.include is None:
+            self.everywhere += delta
+            if scope is None: return
+            for ref in scope.exclude:
+                owners = self.chat_ex.setdefault(ref, set())
+                if delta > 0: owners.add((sid, key))
+                else:
+                    owners.discard((sid, key))
+                    if not owners: del self.chat_ex[ref]
+            return
+        chat_in = self.chat_in
+        for ref in scope.include - scope.exclude:
+            n = chat_in.get(ref, 0) + delta
+            if n: chat_in[ref] = n
+            else: del chat_in[ref]
+
+    def chat_eligible(self, refs):
+        """refs 为同一个群的全部引用形式 (core.chatscope.message_chat_refs)，该群是否还有可生效的订阅"""
+        chat_in = self.chat_in
+        for ref in refs:
+            if ref in chat_in: return True
+        if not self.chat_ex: return self.everywhere > 0
+        excluded = set()
+        for ref in refs: excluded |= self.chat_ex.get(ref, set())
+        return self.everywhere > len(excluded)
+
+    def to_arrays(self):
+        """导出为 (键列表, 扁平数组, 字符串) 供快照使用；空位压缩掉，sid 重新编号"""
+        keys = list(self.keywords)
+        key_index = {k: i for i, k in enumerate(keys)}
+        remap = {}
+        subs = array('q')
+        widx, wkey = array('i', (0,)), array('i')  # 订阅者 -> 键下标，加载时直接还原 words 集合
+        ssid, skey, scope = array('i'), array('i'), []  # 限定了群组范围的订阅
+        for sub in self.subs:
+            if sub is None: continue
+            remap[sub.sid] = len(remap)
+            for key, sc in (sub.scopes or {}).items():
+                ssid.append(remap[sub.sid])
+                skey.append(key_index[key])
+                scope.append(sc.encode())
+            flags = bool(sub.paused) | bool(sub.simple) << 1 | bool(sub.ai) << 2
+            subs.extend((sub.uid, flags, sub.target or 0, sub.limit, sub.digest, int(sub.expire * 1000) if sub.expire else 0))
+            wkey.extend(key_index[k] for k in sub.words)
+            widx.append(len(wkey))
+        kidx, ksid = array('i', (0,)), array('i')
+        for key in keys:
+            ksid.extend(remap[sid] for sid in self.keywords[key])
+            kidx.append(len(ksid))
+        dbid = array('q')
+        for db_id, uid in self.db_ids.items(): dbid.extend((db_id, uid))
+        arrays = {"subs": subs, "widx": widx, "wkey": wkey, "kidx": kidx, "ksid": ksid, "dbid": dbid, "ssid": ssid, "skey": skey}
+        return keys, arrays, {"scope": scope}
+
+    @classmethod
+    def from_arrays(cls, keys, a, scopes=()):
+        table = cls()
+        subs, widx, wkey = a["subs"], a["widx"], a["wkey"]
+        key_at = keys.__getitem__
+        for sid in range(len(subs) // 6):
+            uid, flags, target, limit, digest, expire_ms = subs[sid * 6:sid * 6 + 6]
+            sub = Subscriber(sid, uid)
+            sub.paused, sub.simple, sub.ai = bool(flags & 1), bool(flags & 2), bool(flags & 4)
+            sub.target = target or None
+            sub.limit = limit
+            sub.digest = digest
+            sub.expire = expire_ms / 1000 if expire_ms else None
+            sub.words = set(map(key_at, wkey[widx[sid]:widx[sid + 1]]))
+            table.subs.append(sub)
+            table.by_uid[uid] = sid
+        dbid = a["dbid"]
+        table.db_ids = dict(zip(dbid[0::2], dbid[1::2]))
+        kidx, ksid, index = a["kidx"], a["ksid"], table.keywords
+        for i, key in enumerate(keys):
+            sids = index[key] = array('i')
+            sids.frombytes(ksid[kidx[i]:kidx[i + 1]].cast('B'))
+        table.everywhere = len(ksid) - len(scopes)
+        for sid, ki, s in zip(a["ssid"], a["skey"], scopes):
+            sub, key, sc = table.subs[sid], keys[ki], ChatScope.decode(s)
+            if sub.scopes is None: sub.scopes = {}
+            sub.scopes[key] = sc
+            table._track(sid, key, sc, 1)
+        return table
@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import json
+import logging
+import asyncpg
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 与 update_db_sync.py 中触发器使用的频道一致
+CONFIG_CHANNEL = "config_changes"
+
+
+def row_hash(text: str) -> int:
+    """与 SQL 端 ('x' || substr(md5(s), 1, 16))::bit(64)::bigint 结果一致"""
+    h = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:16], 16)
+    return h - (1 << 64) if h >= (1 << 63) else h
+
+
+class ConfigListener:
+    """监听 Postgres NOTIFY 配置变更
+
+    使用独立连接 LISTEN，短时间内到达的多条变更合并成一批交给 handler；
+    连接断开后自动重连，并调用 on_reconnect 做一次全量同步 (断线期间的通知已丢失)。
+    首次 LISTEN 之前的变更、以及 handler 出错时已取出的那批变更同样收不到了，用 on_resync 对账补齐；
+    补偿同步失败会在下一轮重试，直到成功为止。
+    """
+
+    def __init__(self, handler, on_reconnect=None, on_resync=None, channel=CONFIG_CHANNEL, debounce=0.2):
+        self.handler = handler
+        self.on_reconnect = on_reconnect
+        self.on_resync = on_resync
+        self.channel = channel
+        self.debounce = debounce
+        self._conn = None
+        self._pending = []
+        self._resync = None  # 待执行的补偿同步
+        self._wakeup = asyncio.Event()
+
+    def _on_notify(self, conn, pid, channel, payload):
+        try:
+            self._pending.append(json.loads(payload))
+        except ValueError:
+            logger.warning(f"忽略无法解析的变更通知: {payload}")
+            return
+        self._wakeup.set()
+
+    def _on_terminate(self, conn):
+        logger.warning("⚠️ 配置监听连接已断开")
+        self._wakeup.set()
+
+    async def _connect(self):
+        self._conn = await asyncpg.connect(settings.DB_DSN)
+        self._conn.add_termination_listener(self._on_terminate)
+        await self._conn.add_listener(self.channel, self._on_notify)
+        logger.info(f"📡 已订阅配置变更频道: {self.channel}")
+
+    async def run(self):
+        first = True
+        while True:
+            try:
+                if self._conn is None or self._conn.is_closed():
+                    await self._connect()
+                    self._resync = (None if first else self.on_reconnect) or self.on_resync
+                    first = False
+                if self._resync:
+                    await self._resync()
+                    self._resync = None
+
+                await self._wakeup.wait()
+                # 稍等片刻，把同一事务/同一批操作产生的通知合并
+                await asyncio.sleep(self.debounce)
+                self._wakeup.clear()
+                batch, self._pending = self._pending, []
+                if batch:
+                    try: await self.handler(batch)
+                    except Exception:
+                        self._resync = self._resync or self.on_resync
+                        raise
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"配置同步异常: {e}")
+                await asyncio.sleep(5)
+
+    async def close(self):
+        if self._conn and not self._conn.is_closed():
+            await self._conn.close()
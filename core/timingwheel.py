@@ -0,0 +1,88 @@
+import math
+import time
+
+
+class TimingWheel:
+    """分层时间轮: 大量定时项的插入、取消均为 O(1)，推进时只处理到期的槽
+
+    第 0 层每槽 tick 秒，第 L 层每槽 tick * slots^L 秒；高层槽位到点时把其中的项
+    按剩余时间重新分配到低层 (cascade)。超出最高层跨度的项放在 overflow，
+    最高层转满一圈时重新分配。默认 1 秒 x 64 槽 x 4 层，可覆盖约 194 天。
+    """
+
+    def __init__(self, tick=1.0, slots=64, levels=4, now=None):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._spans = [slots ** level for level in range(levels + 1)]
+        self._wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+        self._overflow = set()
+        self._due = set()  # 加入时已经过期的项，下次 advance 时返回
+        self._deadline = {}  # key -> 到期 tick
+        self._where = {}  # key -> 所在的槽 (取消时直接删除)
+        self._current = int((time.time() if now is None else now) // tick)
+
+    def __len__(self):
+        return len(self._deadline)
+
+    def __contains__(self, key):
+        return key in self._deadline
+
+    def _place(self, key, t):
+        delta = t - self._current
+        if delta <= 0:
+            bucket = self._due
+        else:
+            spans = self._spans
+            for level in range(self.levels):
+                if delta < spans[level + 1]:
+                    bucket = self._wheels[level][(t // spans[level]) % self.slots]
+                    break
+            else:
+                bucket = self._overflow
+        bucket.add(key)
+        self._where[key] = bucket
+
+    def schedule(self, key, deadline):
+        """key 在 deadline (与 now 同一时钟的秒数) 到期；已存在时改为新的到期时间"""
+        self.cancel(key)
+        t = math.ceil(deadline / self.tick)
+        self._deadline[key] = t
+        self._place(key, t)
+
+    def cancel(self, key):
+        bucket = self._where.pop(key, None)
+        if bucket is not None:
+            bucket.discard(key)
+            del self._deadline[key]
+
+    def advance(self, now=None):
+        """推进到 now，返回期间到期的 key 列表"""
+        target = int((time.time() if now is None else now) // self.tick)
+        expired = list(self._due)
+        self._due.clear()
+        spans, slots, wheels = self._spans, self.slots, self._wheels
+        while self._current < target:
+            self._current += 1
+            c = self._current
+            # 逐层检查是否转到新的高层槽位，把该槽的项下放
+            for level in range(1, self.levels + 1):
+                if c % spans[level]: break
+                if level < self.levels:
+                    bucket = wheels[level][(c // spans[level]) % slots]
+                else:
+                    bucket = self._overflow
+                moved = list(bucket)
+                bucket.clear()
+                for key in moved: self._place(key, self._deadline[key])
+            if self._due:
+                expired.extend(self._due)
+                self._due.clear()
+            bucket = wheels[0][c % slots]
+            if bucket:
+                expired.extend(bucket)
+                bucket.clear()
+        for key in expired:
+            self._where.pop(key, None)
+            self._deadline.pop(key, None)
+        return expired
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+import signal
+import socket
+import sys
+from core.database import db
+from core.config import settings
+from core.botpool import BotPool
+from core.outbox import OutboxConsumer
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - Dispatcher - %(levelname)s - %(message)s")
+logger = logging.getLogger("Dispatcher")
+
+STATS_INTERVAL = 60  # 运行统计日志间隔 (秒)
+
+# 推送发送进程: 消费 worker 写入的发件箱 (OUTBOX_ENABLED=1)，可以多开，与 worker 分开扩容
+# 用法: python dispatcher.py [消费者名称]
+# 消费者名称默认为主机名；同一台机器开多个进程时必须各自指定不同且固定的名称，
+# 重启后用同一名称才能先发完上次未确认的推送
+
+async def loop_stats(dispatcher, consumer):
+    while True:
+        await asyncio.sleep(STATS_INTERVAL)
+        dispatcher.prune()
+        logger.info(f"📊 运行统计: {dict(dispatcher.stats(), **consumer.stats())}")
+
+async def main():
+    if not settings.OUTBOX_ENABLED:
+        logger.info("未开启 OUTBOX_ENABLED，推送由 worker 直接发送，退出")
+        return
+    name = sys.argv[1] if len(sys.argv) > 1 else socket.gethostname()
+    await db.connect()
+    dispatcher = BotPool([settings.BOT_TOKEN] + settings.DELIVERY_BOT_TOKENS, rate=settings.DISPATCH_RATE, redis=db.redis)
+    await dispatcher.load_pins()
+    consumer = OutboxConsumer(db.redis, settings.OUTBOX_STREAM, dispatcher, name)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM): loop.add_signal_handler(sig, stop.set)
+
+    tasks = [asyncio.create_task(dispatcher.run()), asyncio.create_task(consumer.run()), asyncio.create_task(loop_stats(dispatcher, consumer))]
+    logger.info(f"📮 消费发件箱 {settings.OUTBOX_STREAM} (消费者 {name}，{len(dispatcher.bots)} 个推送机器人)")
+    await stop.wait()
+
+    # 停止读取，发完已在本地排队的推送；发不完的留在 PEL 里，重启后继续
+    consumer.stop()
+    try: await asyncio.wait_for(tasks[1], 5)
+    except (asyncio.TimeoutError, Exception) as e: logger.debug(f"停止读取: {e!r}")
+    left = await dispatcher.drain()
+    if left: logger.warning(f"⚠️ 退出时仍有 {left} 条推送未发出，重启后继续发送")
+    for t in tasks: t.cancel()
+    await dispatcher.close()
+    await db.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
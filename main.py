@@ -5,6 +5,7 @@ from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
 from aiogram import Bot, Dispatcher
+from core.botpool import bot_id
 from core.config import settings
 from core.database import db
 from models.init_db import init_tables
@@ -19,6 +20,8 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(level
 logger = logging.getLogger("Main")
 
 bot = Bot(token=settings.BOT_TOKEN)
+# 推送机器人 (DELIVERY_BOT_TOKENS) 发出的推送同样带 拉黑/关闭 等按钮，回调要由收到它的机器人处理，一起轮询
+delivery_bots = [Bot(token=t) for t in dict.fromkeys(settings.DELIVERY_BOT_TOKENS) if bot_id(t) != bot_id(settings.BOT_TOKEN)]
 dp = Dispatcher()
 dp.include_router(bot_router)
 
@@ -27,11 +30,11 @@ async def lifespan(app: FastAPI):
     print("🚀 系统启动...")
     await db.connect()
     await init_tables()
-    asyncio.create_task(dp.start_polling(bot, skip_updates=True))
-    logger.info("🤖 机器人监听已启动")
+    asyncio.create_task(dp.start_polling(bot, *delivery_bots, skip_updates=True))
+    logger.info(f"🤖 机器人监听已启动 (另有 {len(delivery_bots)} 个推送机器人)")
     yield
     print("🛑 系统关闭...")
-    await bot.session.close()
+    for b in [bot] + delivery_bots: await b.session.close()
     await db.close()
 
 app = FastAPI(title="TG Monitor SaaS", lifespan=lifespan)
@@ -30,6 +30,8 @@ async def init_tables():
                     user_id INT REFERENCES users(id) ON DELETE CASCADE,
                     word VARCHAR(255) NOT NULL,
                     match_mode VARCHAR(20) DEFAULT 'fuzzy',
+                    include_chats TEXT[] DEFAULT NULL,
+                    exclude_chats TEXT[] DEFAULT NULL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 );
             """)
@@ -10,8 +10,9 @@ cd $PROJECT_DIR
 echo "🧹 正在清理旧进程..."
 # 杀掉占用 7000 端口的主程序
 fuser -k 7000/tcp > /dev/null 2>&1
-# 杀掉 worker 进程
+# 杀掉 worker / dispatcher 进程
 pkill -f "python worker.py" > /dev/null 2>&1
+pkill -f "python dispatcher.py" > /dev/null 2>&1
 
 # 等待 1 秒确保释放
 sleep 1
@@ -25,6 +26,10 @@ nohup python main.py > main.log 2>&1 &
 echo "🛰 正在启动监听进程 (Worker)..."
 nohup python worker.py > worker.log 2>&1 &
 
+# 4. 启动推送进程 (Dispatcher，仅 OUTBOX_ENABLED=1 时工作，否则启动后直接退出)
+echo "📮 正在启动推送进程 (Dispatcher)..."
+nohup python dispatcher.py > dispatcher.log 2>&1 &
+
 echo "---------------------------------------"
 echo "✅ 所有服务已在后台启动！"
 echo "🌐 Web后台: http://你的服务器IP:7000"
@@ -10,4 +10,8 @@ echo "- 主程序 (Main) 已停止"
 pkill -f "python worker.py" > /dev/null 2>&1
 echo "- 监听进程 (Worker) 已停止"
 
+# 3. 杀掉 Dispatcher (SIGTERM，发完本地队列再退出)
+pkill -f "python dispatcher.py" > /dev/null 2>&1
+echo "- 推送进程 (Dispatcher) 已停止"
+
 echo "✅ 全部停止完毕。"
\ No newline at end of file
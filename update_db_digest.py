@@ -0,0 +1,18 @@
+import asyncio
+from core.database import db
+
+async def update():
+    await db.connect()
+    async with db.pg_pool.acquire() as conn:
+        print("正在更新数据库...")
+        # 合并推送窗口 (秒)，0 表示逐条推送 (默认)
+        await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS notify_digest_window INT DEFAULT 0")
+        print("✅ 数据库字段更新完毕")
+    await db.close()
+
+if __name__ == "__main__":
+    try:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+    except: pass
+    asyncio.run(update())
@@ -0,0 +1,19 @@
+import asyncio
+from core.database import db
+
+async def update():
+    await db.connect()
+    async with db.pg_pool.acquire() as conn:
+        print("正在更新数据库...")
+        # 关键词的群组范围: 只在这些群生效 / 排除这些群 (chat_id 或 @用户名，NULL=全网)
+        await conn.execute("ALTER TABLE keywords ADD COLUMN IF NOT EXISTS include_chats TEXT[] DEFAULT NULL")
+        await conn.execute("ALTER TABLE keywords ADD COLUMN IF NOT EXISTS exclude_chats TEXT[] DEFAULT NULL")
+        print("✅ 数据库字段更新完毕")
+    await db.close()
+
+if __name__ == "__main__":
+    try:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+    except: pass
+    asyncio.run(update())
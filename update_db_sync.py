@@ -0,0 +1,50 @@
+import asyncio
+from core.database import db
+
+# 配置变更通知：keywords / filter_words / users / system_settings / user_blacklist 任一行变化时
+# 通过 pg_notify 推送给 worker，worker 只刷新受影响的用户，不再整表重载
+TABLES = ["keywords", "filter_words", "users", "system_settings", "user_blacklist"]
+
+async def update():
+    await db.connect()
+    async with db.pg_pool.acquire() as conn:
+        print("正在安装配置变更触发器...")
+        await conn.execute("""
+            CREATE OR REPLACE FUNCTION notify_config_change() RETURNS trigger AS $$
+            DECLARE
+                rec RECORD;
+                payload JSON;
+            BEGIN
+                IF TG_OP = 'DELETE' THEN rec := OLD; ELSE rec := NEW; END IF;
+                IF TG_TABLE_NAME = 'users' THEN
+                    payload := json_build_object('t', TG_TABLE_NAME, 'op', TG_OP, 'user_id', rec.id);
+                ELSIF TG_TABLE_NAME = 'system_settings' THEN
+                    payload := json_build_object('t', TG_TABLE_NAME, 'op', TG_OP, 'key', rec.key);
+                ELSIF TG_TABLE_NAME = 'user_blacklist' THEN
+                    -- 带上被拉黑的 ID，worker 直接增删，不需要回查
+                    payload := json_build_object('t', TG_TABLE_NAME, 'op', TG_OP, 'user_id', rec.user_id, 'blocked_id', rec.blocked_id);
+                ELSE
+                    payload := json_build_object('t', TG_TABLE_NAME, 'op', TG_OP, 'user_id', rec.user_id);
+                END IF;
+                PERFORM pg_notify('config_changes', payload::text);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+        for table in TABLES:
+            await conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_config_change ON {table}")
+            await conn.execute(f"""
+                CREATE TRIGGER trg_{table}_config_change
+                AFTER INSERT OR UPDATE OR DELETE ON {table}
+                FOR EACH ROW EXECUTE FUNCTION notify_config_change()
+            """)
+            print(f"  - {table} ✅")
+        print("✅ 触发器安装完毕")
+    await db.close()
+
+if __name__ == "__main__":
+    try:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+    except: pass
+    asyncio.run(update())
@@ -1,4 +1,5 @@
 import os
+import json
 import secrets
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
@@ -214,6 +215,29 @@ async def save_reply_menus(data: ReplyMenuListRequest):
 # ===========================
 # 3. 其他业务接口
 # ===========================
+@router.get("/monitor/hotwords")
+async def get_hot_keywords():
+    """汇总各 worker 上报的关键词命中率 (worker:stats:<pid>)"""
+    result = {"messages": 0, "window": settings.HOTWORD_WINDOW, "throttle_ratio": settings.HOTWORD_THROTTLE_RATIO,
+              "workers": 0, "throttled": [], "top": []}
+    if not db.redis: return result
+    hits, throttled = {}, set()
+    async for key in db.redis.scan_iter(match="worker:stats:*"):
+        raw = await db.redis.get(key)
+        if not raw: continue
+        stats = json.loads(raw)
+        hot = stats.get("hotwords")
+        if not hot: continue
+        result["workers"] += 1
+        result["messages"] += hot["messages"]
+        for item in hot["top"]: hits[item["word"]] = hits.get(item["word"], 0) + item["hits"]
+        throttled.update(stats.get("throttled") or [])
+    n = result["messages"]
+    result["top"] = [{"word": w, "hits": c, "ratio": round(c / n, 4) if n else 0, "throttled": w in throttled}
+                     for w, c in sorted(hits.items(), key=lambda x: -x[1])]
+    result["throttled"] = sorted(throttled)
+    return result
+
 @router.post("/finance/cdks/generate")
 async def generate_cdks(data: CDKGenRequest):
     codes = []
@@ -1,113 +1,456 @@
 import asyncio
+import functools
+import html
+import json
 import logging
-import datetime
-import re
+import os
+import time
 import random
 from pyrogram import Client, filters, idle
-from pyrogram.handlers import MessageHandler
-from aiogram import Bot
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.exceptions import TelegramForbiddenError
+from pyrogram.handlers import MessageHandler, EditedMessageHandler
+from aiogram.types import InlineKeyboardButton
 from core.database import db
 from core.config import settings
+from core.spam import SpamScorer
+from core.dedup import MessageDeduper
+from core.edits import EditTracker, content_digest
+from core.albums import MediaGroupBuffer
+from core.reputation import SenderReputation, DEMOTE, DROP
+from core.flood import ChatFloodGuard, NORMAL
+from core.botpool import BotPool
+from core.outbox import OutboxWriter
+from core.simhash import simhash, NearDupIndex
+from core.hotwords import HotKeywordTracker
+from core.digest import DigestBuffer
+from core.render import NotifyRenderer
+from core.sync import ConfigListener, row_hash
+from core.snapshot import dump_config, load_config
+from core.subscribers import SubscriberTable
+from core.blacklist import Blacklist
+from core.chatscope import chat_ref, message_chat_refs
+from core.timingwheel import TimingWheel
+from core.normalize import Normalizer, load_t2s_table
+from core.matcher import MatchEngine, OwnedMatcher, EMPTY_ENGINE, EMPTY_OWNED
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - Worker - %(levelname)s - %(message)s")
 logger = logging.getLogger("Worker")
 
 # 缓存结构
-KEYWORDS_CACHE = {} 
-ADS_CACHE = []
-FILTER_CACHE = {} 
-
-bot = Bot(token=settings.BOT_TOKEN)
-
-# AI 评分逻辑 (保留不变)
-def is_spam_ai(text: str) -> bool:
-    score = 0
-    emoji_count = len(re.findall(r'[\U0001f600-\U0001f64f]', text))
-    if emoji_count > 5: score += 30
-    if emoji_count > 10: score += 50
-    spam_words = ["博彩", "首存", "网址", "点击链接", "刷单", "兼职", "AV", "裸聊"]
-    for w in spam_words:
-        if w in text: score += 40
-    links = text.count("http") + text.count("t.me")
-    if links > 3: score += 40
-    return score >= 60
+SUBSCRIBERS = SubscriberTable()  # 订阅者表 + 关键词 -> 订阅者 sid 索引
+RENDERER = NotifyRenderer()  # 推送模板与广告按钮，广告变化时整体重建
+FILTER_CACHE = {}  # tg_id -> [过滤词]
+BLACKLIST = Blacklist()  # 订阅者拉黑的发送者，推送前排除
+MATCHER = EMPTY_ENGINE  # 由 SUBSCRIBERS.keywords 编译出的匹配引擎，随配置一起整体替换
+FILTER_INDEX = EMPTY_OWNED  # 全部用户的过滤词合并成一个自动机，词 -> 拥有者集合
+SYNC_LOCK = asyncio.Lock()  # 全量加载与增量同步互斥
+EXPIRY = TimingWheel()  # tg_id -> 会员到期时间，到期即从订阅者表摘除
+MATCHER_DIRTY = False  # 订阅者到期摘除后自动机里残留无人订阅的词，稍后统一重建
+RESYNC_INTERVAL = 300  # 校验和兜底全量同步的间隔 (秒)
+STATS_INTERVAL = 60  # 运行统计写入 Redis 的间隔 (秒)
+CONFIG_VERSION = 0  # 配置每变化一次加一，用来判断快照是否需要重写
+SNAPSHOT_VERSION = -1  # 最近一次写入快照时的 CONFIG_VERSION
+EXPIRY_INTERVAL = 1  # 时间轮推进间隔 (秒)
+MATCHER_REBUILD_INTERVAL = 60  # 到期摘除引起的自动机重建最短间隔 (秒)
+THROTTLE_INTERVAL = 5  # 刷新限流词表的间隔 (秒)
+DIGEST_INTERVAL = 1  # 到期摘要检查间隔 (秒)
+REPUTATION_SYNC_INTERVAL = 10  # 与其它 worker 交换丢弃名单的间隔 (秒)
+ALBUM_WINDOW = 1.0  # 相册各条消息的合并等待时间 (秒)
+ALBUM_INTERVAL = 0.2  # 相册缓冲到期检查间隔 (秒)
+
+# 推送调度: 全局与每个目标的令牌桶、RetryAfter 退避重试，匹配流程只入队不等待网络
+# 配置了多个推送机器人时按推送目标一致性哈希分片，每个机器人各自限速
+# 开启 OUTBOX_ENABLED 时在 main() 中换成 OutboxWriter，推送写入 Redis Stream 由 dispatcher.py 进程发送
+dispatcher = BotPool([settings.BOT_TOKEN] + settings.DELIVERY_BOT_TOKENS)
+
+# AI 广告评分 (只与消息内容有关，每条消息最多算一次)
+spam_scorer = SpamScorer()
+
+# 多个监听账号在同一群时，同一条消息只处理一次
+deduper = MessageDeduper()
+
+# 已处理消息的内容指纹与命中词，编辑消息只推送新增的关键词
+edits = EditTracker()
+
+# 发送者信誉: 刷屏账号在查找收件人之前降级为摘要或直接丢弃
+reputation = SenderReputation(
+    demote_rate=settings.REPUTATION_DEMOTE_RATE, drop_rate=settings.REPUTATION_DROP_RATE,
+    max_chats=settings.REPUTATION_MAX_CHATS, reports=settings.REPUTATION_REPORTS,
+) if settings.REPUTATION_DEMOTE_RATE > 0 else None
+
+# 单群刷屏时按令牌桶逐级降级，不拖慢其它群
+flood = ChatFloodGuard(rate=settings.FLOOD_CHAT_RATE, burst=settings.FLOOD_CHAT_BURST) if settings.FLOOD_CHAT_RATE > 0 else None
+
+# 相册 (同一 media_group_id 的多条消息) 合并后只匹配、推送一次
+albums = MediaGroupBuffer(window=ALBUM_WINDOW)
+
+# 同一广告稍作改动后在多个群刷屏时，每个订阅者在窗口期内只收到一次
+neardup = NearDupIndex(window=settings.NEARDUP_WINDOW) if settings.NEARDUP_WINDOW > 0 else None
+NEARDUP_MIN_LEN = 20  # 规范化后短于该长度的消息不做近似去重，避免误伤短句
+
+# 关键词命中率 (滑动窗口)；命中率过高的关键词可自动改为摘要推送
+hotwords = HotKeywordTracker(window=settings.HOTWORD_WINDOW)
+THROTTLED = frozenset()
+digests = DigestBuffer(window=settings.DIGEST_WINDOW, header="<b>📦 高频关键词摘要</b>\n")
+# 开启了合并推送的订阅者 (users.notify_digest_window > 0)，按各自的窗口合并
+user_digests = DigestBuffer(header="<b>📦 合并推送</b>\n")
+
+# 消息与关键词共用的规范化器 (全半角/大小写/繁简/零宽与分隔符)
+NORMALIZER = Normalizer(load_t2s_table(settings.T2S_TABLE_PATH))
+
+# users.expire_at 是不带时区的 TIMESTAMP，与 NOW() 比较时按会话时区解释；到期时间统一在 SQL 里
+# 按同样的规则换算成 unix 秒 (expire_ts)，时间轮与校验和都用它，不受 worker 所在机器时区影响
+KEYWORD_SQL = """
+    SELECT k.word, k.match_mode, k.include_chats, k.exclude_chats, u.id AS user_db_id, u.tg_id, u.is_paused, u.notify_simple_mode, u.notify_target_id,
+           u.fuzzy_limit, u.ai_filter_enabled, u.notify_digest_window, extract(epoch FROM u.expire_at::timestamptz)::float8 AS expire_ts
+    FROM keywords k
+    JOIN users u ON k.user_id = u.id
+    WHERE u.is_banned = FALSE AND (u.expire_at IS NULL OR u.expire_at > NOW())
+"""
+FILTER_SQL = "SELECT u.id AS user_db_id, u.tg_id, f.word FROM filter_words f JOIN users u ON f.user_id = u.id"
+BLACKLIST_SQL = "SELECT u.id AS user_db_id, u.tg_id, b.blocked_id FROM user_blacklist b JOIN users u ON b.user_id = u.id"
+
+# 与 user_rows() 生成的字符串逐字一致，用来比对内存与数据库是否漂移
+CONFIG_ROWS_SQL = """
+    SELECT u.id AS user_db_id,
+           concat_ws('|', u.tg_id, k.word, COALESCE(k.match_mode, 'fuzzy'), COALESCE(u.is_paused, FALSE)::int,
+                     COALESCE(u.notify_simple_mode, FALSE)::int, COALESCE(u.notify_target_id, 0),
+                     COALESCE(u.fuzzy_limit, 0), COALESCE(u.ai_filter_enabled, FALSE)::int, COALESCE(u.notify_digest_window, 0),
+                     COALESCE(floor(extract(epoch FROM u.expire_at::timestamptz))::bigint, 0),
+                     array_to_string(ARRAY(SELECT c FROM unnest(k.include_chats) c ORDER BY c COLLATE "C"), ','),
+                     array_to_string(ARRAY(SELECT c FROM unnest(k.exclude_chats) c ORDER BY c COLLATE "C"), ',')) AS s
+    FROM keywords k
+    JOIN users u ON k.user_id = u.id
+    WHERE u.is_banned = FALSE AND (u.expire_at IS NULL OR u.expire_at > NOW())
+    UNION
+    SELECT u.id, concat_ws('|', 'f', u.tg_id, f.word) FROM filter_words f JOIN users u ON f.user_id = u.id
+    UNION
+    SELECT u.id, concat_ws('|', 'b', u.tg_id, b.blocked_id) FROM user_blacklist b JOIN users u ON b.user_id = u.id
+"""
+CHECKSUM_SQL = f"""
+    SELECT COUNT(*) AS n, COALESCE(SUM(('x' || substr(md5(s), 1, 16))::bit(64)::bigint), 0) AS h
+    FROM ({CONFIG_ROWS_SQL}) t
+"""
+USER_CHECKSUM_SQL = f"""
+    SELECT user_db_id, COUNT(*) AS n, SUM(('x' || substr(md5(s), 1, 16))::bit(64)::bigint) AS h
+    FROM ({CONFIG_ROWS_SQL}) t GROUP BY user_db_id
+"""
+
+def user_rows(uid):
+    """单个用户 (tg_id) 在内存中的规范化配置行集合，格式与 CONFIG_ROWS_SQL 相同"""
+    items = set()
+    sub = SUBSCRIBERS.get(uid)
+    if sub is not None:
+        scopes = sub.scopes or {}
+        for key in sub.words:
+            mode, word = key
+            scope = scopes[key].encode() if key in scopes else "|"
+            items.add(f"{sub.uid}|{word}|{mode}|{int(bool(sub.paused))}|{int(bool(sub.simple))}|{sub.target or 0}|{sub.limit}|{int(bool(sub.ai))}|{sub.digest}|{int(sub.expire or 0)}|{scope}")
+    for w in FILTER_CACHE.get(uid, ()): items.add(f"f|{uid}|{w}")
+    for b in BLACKLIST.by_user.get(uid, ()): items.add(f"b|{uid}|{b}")
+    return items
+
+def config_rows():
+    """当前内存配置的全部规范化行"""
+    items = set()
+    for uid in SUBSCRIBERS.by_uid.keys() | FILTER_CACHE.keys() | BLACKLIST.by_user.keys(): items |= user_rows(uid)
+    return items
+
+async def rebuild_matcher():
+    global MATCHER, MATCHER_DIRTY
+    # 编译放到线程里，避免大词表阻塞事件循环
+    MATCHER_DIRTY = False
+    MATCHER = await asyncio.to_thread(MatchEngine, list(SUBSCRIBERS.keywords), NORMALIZER)
+
+def add_keyword_row(table, sub, r):
+    """按 KEYWORD_SQL 的一行挂关键词 (含群组范围)，返回新出现的键 (已有人订阅时为 None)"""
+    include = [ref for c in r['include_chats'] or () if (ref := chat_ref(c))]
+    exclude = [ref for c in r['exclude_chats'] or () if (ref := chat_ref(c))]
+    return table.add_keyword(sub, r['word'], r['match_mode'], include, exclude)
+
+def build_expiry(table):
+    wheel = TimingWheel()
+    for sub in table.subs:
+        if sub is not None and sub.expire: wheel.schedule(sub.uid, sub.expire)
+    return wheel
+
+def build_filter_index(filter_cache):
+    """过滤词按规范化后的形式合并，与消息的规范化文本匹配"""
+    word_owners = {}
+    for uid, words in filter_cache.items():
+        for w in words:
+            # 规范化后变空或变了意思的过滤词 (如 C++ 变成 c) 会误拦所有含 c 的消息，跳过
+            reason = NORMALIZER.lossy(w)
+            if reason is not None:
+                logger.warning(f"忽略过滤词 {w} ({uid}): {reason}")
+                continue
+            word_owners.setdefault(NORMALIZER.word(w), set()).add(uid)
+    return OwnedMatcher(word_owners)
+
+async def rebuild_filter_index():
+    global FILTER_INDEX
+    FILTER_INDEX = await asyncio.to_thread(build_filter_index, FILTER_CACHE)
+
+async def load_ads(conn):
+    global RENDERER
+    ads = await conn.fetch("SELECT key, value FROM system_settings WHERE key LIKE 'btn_ad_%' ORDER BY description::int")
+    new_ads = []
+    row_btns = []
+    for r in ads:
+        text = r['key'].split('_', 3)[3]
+        row_btns.append(InlineKeyboardButton(text=text, url=r['value']))
+        if len(row_btns) == 2:
+            new_ads.append(row_btns)
+            row_btns = []
+    if row_btns: new_ads.append(row_btns)
+    RENDERER = NotifyRenderer(new_ads)
+
+def build_blacklist(rows, table):
+    blacklist = Blacklist()
+    for r in rows:
+        table.db_ids[r['user_db_id']] = r['tg_id']
+        blacklist.add(r['tg_id'], r['blocked_id'])
+    return blacklist
+
+async def load_blacklist(conn):
+    """全量加载黑名单 (快照不含黑名单，从快照启动时单独加载)"""
+    global BLACKLIST
+    BLACKLIST = build_blacklist(await conn.fetch(BLACKLIST_SQL), SUBSCRIBERS)
 
 async def load_settings():
-    """加载配置 (保留不变)"""
-    global KEYWORDS_CACHE, ADS_CACHE, FILTER_CACHE
+    """全量加载配置 (启动、断线重连、校验和不一致时使用)"""
+    global SUBSCRIBERS, FILTER_CACHE, BLACKLIST, MATCHER, FILTER_INDEX, EXPIRY, MATCHER_DIRTY, CONFIG_VERSION
     if not db.pg_pool: await db.connect()
     
-    async with db.pg_pool.acquire() as conn:
-        rows = await conn.fetch("""
-            SELECT k.word, u.tg_id, u.is_paused, u.notify_simple_mode, u.notify_target_id,
-                   u.fuzzy_limit, u.ai_filter_enabled
-            FROM keywords k
-            JOIN users u ON k.user_id = u.id
-            WHERE u.is_banned = FALSE AND (u.expire_at IS NULL OR u.expire_at > NOW())
-        """)
-        
-        new_kw = {}
+    async with SYNC_LOCK:
+        async with db.pg_pool.acquire() as conn:
+            rows = await conn.fetch(KEYWORD_SQL)
+            f_rows = await conn.fetch(FILTER_SQL)
+            b_rows = await conn.fetch(BLACKLIST_SQL)
+            await load_ads(conn)
+
+        table = SubscriberTable()
         for r in rows:
-            word = r['word']
-            user_config = {
-                'uid': r['tg_id'],
-                'paused': r['is_paused'],
-                'simple': r['notify_simple_mode'],
-                'target': r['notify_target_id'],
-                'limit': r['fuzzy_limit'],
-                'ai': r['ai_filter_enabled']
-            }
-            if word not in new_kw: new_kw[word] = []
-            exists = False
-            for u in new_kw[word]:
-                if u['uid'] == user_config['uid']:
-                    exists = True
-                    break
-            if not exists:
-                new_kw[word].append(user_config)
-        KEYWORDS_CACHE = new_kw
-        
-        f_rows = await conn.fetch("SELECT u.tg_id, f.word FROM filter_words f JOIN users u ON f.user_id = u.id")
+            add_keyword_row(table, table.upsert(r), r)
+
         new_filter = {}
         for r in f_rows:
             uid = r['tg_id']
+            table.db_ids[r['user_db_id']] = uid
             if uid not in new_filter: new_filter[uid] = []
             new_filter[uid].append(r['word'])
-        FILTER_CACHE = new_filter
-        
-        ads = await conn.fetch("SELECT key, value FROM system_settings WHERE key LIKE 'btn_ad_%' ORDER BY description::int")
-        new_ads = []
-        row_btns = []
-        for r in ads:
-            text = r['key'].split('_', 3)[3]
-            row_btns.append(InlineKeyboardButton(text=text, url=r['value']))
-            if len(row_btns) == 2:
-                new_ads.append(row_btns)
-                row_btns = []
-        if row_btns: new_ads.append(row_btns)
-        ADS_CACHE = new_ads
+        new_blacklist = build_blacklist(b_rows, table)
+
+        new_matcher = await asyncio.to_thread(MatchEngine, list(table.keywords), NORMALIZER)
+        new_index = await asyncio.to_thread(build_filter_index, new_filter)
+        # 所有引用同时替换，不会出现新旧混用
+        SUBSCRIBERS, MATCHER, EXPIRY = table, new_matcher, build_expiry(table)
+        FILTER_CACHE, FILTER_INDEX, BLACKLIST = new_filter, new_index, new_blacklist
+        MATCHER_DIRTY = False
+        CONFIG_VERSION += 1
         
-    logger.info(f"♻️ 配置刷新: {len(KEYWORDS_CACHE)} 关键词")
+    logger.info(f"♻️ 配置刷新: {len(SUBSCRIBERS.keywords)} 关键词, {len(SUBSCRIBERS)} 订阅者")
+
+async def refresh_users(db_ids):
+    """增量刷新指定用户 (users.id) 的关键词与过滤词"""
+    db_ids = list(db_ids)
+    async with db.pg_pool.acquire() as conn:
+        rows = await conn.fetch(KEYWORD_SQL + " AND u.id = ANY($1::int[])", db_ids)
+        f_rows = await conn.fetch(FILTER_SQL + " WHERE u.id = ANY($1::int[])", db_ids)
+        b_rows = await conn.fetch(BLACKLIST_SQL + " WHERE u.id = ANY($1::int[])", db_ids)
+
+    table = SUBSCRIBERS
+    gone, added = set(), set()  # 摘除后无人订阅的键 / 重新挂上后新出现的键
+    old_filters = {}  # tg_id -> 刷新前的过滤词
+    for db_id in db_ids:
+        uid = table.db_ids.pop(db_id, None)
+        if uid is None: continue
+        gone.update(table.remove(uid))
+        words = FILTER_CACHE.pop(uid, None)
+        if words: old_filters[uid] = set(words)
+        BLACKLIST.remove_user(uid)
+        EXPIRY.cancel(uid)
+
+    touched = {}
+    for r in rows:
+        sub = touched[r['tg_id']] = table.upsert(r)
+        key = add_keyword_row(table, sub, r)
+        if key: added.add(key)
+    # 续费/改期后按新的到期时间重新排入时间轮
+    for sub in touched.values():
+        if sub.expire: EXPIRY.schedule(sub.uid, sub.expire)
+    for r in f_rows:
+        table.db_ids[r['user_db_id']] = r['tg_id']
+        FILTER_CACHE.setdefault(r['tg_id'], []).append(r['word'])
+    for r in b_rows:
+        table.db_ids[r['user_db_id']] = r['tg_id']
+        BLACKLIST.add(r['tg_id'], r['blocked_id'])
+
+    # 只有词表本身变化时才需要重新编译自动机，暂停/精简模式等用户设置变化直接生效:
+    # 摘除又原样挂回的键相互抵消，关键词集合不变；过滤词按用户比较 (自动机记录词的拥有者)
+    filter_uids = old_filters.keys() | {r['tg_id'] for r in f_rows}
+    filter_changed = any(old_filters.get(uid, set()) != set(FILTER_CACHE.get(uid, ())) for uid in filter_uids)
+    if gone != added: await rebuild_matcher()
+    if filter_changed: await rebuild_filter_index()
+
+async def apply_config_changes(events):
+    """处理一批 NOTIFY 变更事件"""
+    global CONFIG_VERSION
+    user_ids = set()
+    blocks = []
+    reload_ads = False
+    for e in events:
+        if e.get('t') == 'system_settings':
+            if str(e.get('key', '')).startswith('btn_ad_'): reload_ads = True
+        elif e.get('t') == 'user_blacklist' and e.get('op') in ('INSERT', 'DELETE') and e.get('blocked_id') is not None:
+            blocks.append(e)
+        elif e.get('user_id') is not None:
+            user_ids.add(e['user_id'])
+
+    async with SYNC_LOCK:
+        # 拉黑/解除拉黑直接改内存索引，不需要查库；内存中还没有该用户时按用户刷新
+        for e in blocks:
+            uid = SUBSCRIBERS.db_ids.get(e['user_id'])
+            if uid is None: user_ids.add(e['user_id'])
+            elif e['op'] == 'INSERT': BLACKLIST.add(uid, e['blocked_id'])
+            else: BLACKLIST.discard(uid, e['blocked_id'])
+        if user_ids:
+            await refresh_users(user_ids)
+            CONFIG_VERSION += 1
+        if reload_ads:
+            async with db.pg_pool.acquire() as conn:
+                await load_ads(conn)
+    logger.info(f"⚡️ 增量同步: {len(events)} 条变更, {len(user_ids)} 个用户")
+
+async def resync_if_drifted():
+    """比对数据库与内存配置的校验和，不一致时全量重载"""
+    async with db.pg_pool.acquire() as conn:
+        remote = await conn.fetchrow(CHECKSUM_SQL)
+    async with SYNC_LOCK:
+        items = config_rows()
+        local_n, local_h = len(items), sum(row_hash(s) for s in items)
+    if remote['n'] == local_n and int(remote['h']) == local_h: return
+    logger.warning(f"⚠️ 配置校验不一致 (db={remote['n']}, mem={local_n})，执行全量同步")
+    await load_settings()
+
+async def sync_deltas():
+    """逐用户比对校验和，只刷新与数据库不一致的用户 (从快照启动后补齐增量)"""
+    global CONFIG_VERSION
+    async with db.pg_pool.acquire() as conn:
+        rows = await conn.fetch(USER_CHECKSUM_SQL)
+    remote = {r['user_db_id']: (r['n'], int(r['h'])) for r in rows}
+    async with SYNC_LOCK:
+        local = {}
+        for db_id, uid in SUBSCRIBERS.db_ids.items():
+            items = user_rows(uid)
+            if items: local[db_id] = (len(items), sum(row_hash(s) for s in items))
+        changed = {i for i in remote.keys() | local.keys() if remote.get(i) != local.get(i)}
+        if changed:
+            await refresh_users(changed)
+            CONFIG_VERSION += 1
+    logger.info(f"⚡️ 快照增量同步: {len(changed)} 个用户有变化")
+
+def load_snapshot():
+    """从快照文件恢复配置，成功返回 True；快照缺失或不兼容时返回 False 走全量加载"""
+    global SUBSCRIBERS, FILTER_CACHE, MATCHER, FILTER_INDEX, EXPIRY
+    path = settings.SNAPSHOT_PATH
+    if not path or not os.path.exists(path): return False
+    t0 = time.perf_counter()
+    try:
+        table, filter_cache, engine, filter_index, meta = load_config(path, NORMALIZER)
+    except Exception as e:
+        logger.warning(f"⚠️ 快照不可用，改为全量加载: {e}")
+        return False
+    SUBSCRIBERS, MATCHER, EXPIRY = table, engine, build_expiry(table)
+    FILTER_CACHE, FILTER_INDEX = filter_cache, filter_index
+    age = int(time.time()) - meta['created']
+    logger.info(f"💾 快照启动 {(time.perf_counter() - t0) * 1000:.0f}ms: {meta['keywords']} 关键词, {meta['subscribers']} 订阅者 (生成于 {age}s 前)")
+    return True
+
+async def save_snapshot():
+    """配置有变化时重写快照 (整个过程持有 SYNC_LOCK，保证表与匹配器一致)"""
+    global SNAPSHOT_VERSION
+    # 自动机里还有已摘除订阅者的词时先不写，等重建后再写
+    if not settings.SNAPSHOT_PATH or SNAPSHOT_VERSION == CONFIG_VERSION or MATCHER_DIRTY: return
+    async with SYNC_LOCK:
+        version = CONFIG_VERSION
+        await asyncio.to_thread(dump_config, settings.SNAPSHOT_PATH, SUBSCRIBERS, FILTER_CACHE, MATCHER, FILTER_INDEX, NORMALIZER)
+    SNAPSHOT_VERSION = version
+
+async def expire_subscribers():
+    """推进时间轮，会员到期的订阅者立即从订阅者表摘除"""
+    global CONFIG_VERSION, MATCHER_DIRTY
+    expired = EXPIRY.advance()
+    if not expired: return
+    removed = 0
+    async with SYNC_LOCK:
+        now = time.time()
+        table = SUBSCRIBERS
+        for uid in expired:
+            sub = table.get(uid)
+            if sub is None or not sub.expire: continue
+            # 等锁期间可能已续费，以订阅者当前的到期时间为准
+            if sub.expire > now:
+                EXPIRY.schedule(uid, sub.expire)
+                continue
+            if table.remove(uid): MATCHER_DIRTY = True
+            removed += 1
+        if removed: CONFIG_VERSION += 1
+    if removed: logger.info(f"⌛ 会员到期，已停止推送 {removed} 个订阅者")
+
+async def loop_expiry():
+    last_rebuild = time.monotonic()
+    while True:
+        await asyncio.sleep(EXPIRY_INTERVAL)
+        try:
+            await expire_subscribers()
+            # 无人订阅的词留在自动机里只会产生空命中，攒一段时间再统一重建
+            if MATCHER_DIRTY and time.monotonic() - last_rebuild >= MATCHER_REBUILD_INTERVAL:
+                async with SYNC_LOCK:
+                    if MATCHER_DIRTY: await rebuild_matcher()
+                last_rebuild = time.monotonic()
+        except Exception as e:
+            logger.error(f"到期处理失败: {e}")
 
-async def get_user_history(user_id, chat_id, current_keyword):
+async def get_user_history(user_id, chat_id, current_keywords):
     if not user_id: return "无"
     async with db.pg_pool.acquire() as conn:
         rows = await conn.fetch("SELECT keyword, msg_link FROM message_history WHERE user_id = $1 ORDER BY id DESC LIMIT 5", user_id)
     if not rows: return "无"
     links = []
-    seen = set()
+    seen = set(current_keywords)
     for r in rows:
-        if r['keyword'] == current_keyword or r['keyword'] in seen: continue
+        if r['keyword'] in seen: continue
         seen.add(r['keyword'])
-        links.append(f"<a href='{r['msg_link']}'>{r['keyword']}</a>")
+        links.append(f"<a href='{html.escape(r['msg_link'])}'>{html.escape(r['keyword'], quote=False)}</a>")
     return "、".join(links) if links else "无"
 
-async def save_history(user_id, chat_id, keyword, msg_link):
-    if not user_id: return
+async def save_history(user_id, chat_id, keywords, msg_link):
+    if not user_id or not keywords: return
     async with db.pg_pool.acquire() as conn:
-        await conn.execute("INSERT INTO message_history (user_id, chat_id, keyword, msg_link) VALUES ($1, $2, $3, $4)", user_id, chat_id, keyword, msg_link)
+        await conn.executemany("INSERT INTO message_history (user_id, chat_id, keyword, msg_link) VALUES ($1, $2, $3, $4)", [(user_id, chat_id, kw, msg_link) for kw in keywords])
+
+def make_snippet(content, spans, limit=200):
+    """截取消息内容；命中位置超出开头 limit 字时，以第一个命中处为中心截取"""
+    if len(content) <= limit: return content
+    start = min((s for s, _ in spans.values()), default=0)
+    if start + 20 <= limit: return content[:limit]
+    begin = max(0, start - limit // 4)
+    return "…" + content[begin:begin + limit]
+
+def group_hits(hit_keys, table, chat_refs):
+    """把命中的 (模式, 关键词) 按订阅者归并: uid -> (订阅者, [关键词...])；不在本群生效的订阅跳过"""
+    grouped = {}
+    subs, index = table.subs, table.keywords
+    for key in hit_keys:
+        kw = key[1]
+        for sid in index.get(key, ()):
+            sub = subs[sid]
+            scopes = sub.scopes
+            if scopes is not None and key in scopes and not scopes[key].allows(chat_refs): continue
+            entry = grouped.get(sub.uid)
+            if entry is None: grouped[sub.uid] = (sub, [kw])
+            elif kw not in entry[1]: entry[1].append(kw)
+    return grouped
 
 # 🟢 [新增] 执行私信任务函数
 async def perform_dm_task(session_str, target_username, text, owner_db_id):
@@ -143,130 +486,284 @@ async def perform_dm_task(session_str, target_username, text, owner_db_id):
             try: await client.stop()
             except: pass
 
+async def after_push(uid, target_chat_id, user_words, target_username):
+    """推送成功后: 记录日志并触发自动私信"""
+    logger.info(f"✅ 推送 -> {target_chat_id} (词:{'、'.join(user_words)})")
+    await auto_dm(uid, target_username)
+
+async def auto_dm(uid, target_username):
+    """按订阅者的私信配置给发送者发自动私信"""
+    if not target_username: return # 必须有用户名才能私信
+    try:
+        async with db.pg_pool.acquire() as conn:
+            # 1. 查找该用户的私信配置 (owner_id 对应 users.id)
+            # 联表查询: users.tg_id -> users.id -> dm_settings & dm_accounts & dm_templates
+            dm_data = await conn.fetchrow("""
+                SELECT s.is_auto_reply, 
+                       (SELECT session_string FROM dm_accounts WHERE owner_id = u.id AND status='ready' ORDER BY RANDOM() LIMIT 1) as session,
+                       (SELECT text_content FROM dm_content_templates WHERE user_id = u.id AND is_active=TRUE LIMIT 1) as content
+                FROM users u
+                JOIN dm_settings s ON s.user_id = u.id
+                WHERE u.tg_id = $1
+            """, uid)
+        
+        # 2. 判断是否满足发送条件
+        if dm_data and dm_data['is_auto_reply'] and dm_data['session'] and dm_data['content']:
+            # 异步执行，不阻塞主流程
+            asyncio.create_task(
+                perform_dm_task(
+                    dm_data['session'], 
+                    target_username, 
+                    dm_data['content'], 
+                    uid # owner_id (这里没用到，可用于日志)
+                )
+            )
+            logger.info(f"⚖️ 触发自动私信 -> @{target_username}")
+            
+    except Exception as e:
+        logger.error(f"AutoDM Check Error: {e}")
+
 async def handle_new_message(client: Client, message):
+    content = message.text or message.caption
+    if not content: return
+    if not deduper.first_local(message.chat.id, message.id): return
+    level = NORMAL
+    if flood is not None:
+        ok, level = flood.admit(message.chat.id)
+        if not ok: return
+    if message.media_group_id:
+        # 相册先进缓冲，到期后合并说明文字统一处理 (见 loop_albums)
+        for group in albums.add((message.chat.id, message.media_group_id), message, content): process_album(group)
+        return
+    await process_message(message, content, lite=level != NORMAL)
+
+def process_album(group):
+    # 按交出时所在群的降级状态处理，与普通消息一致
+    lite = flood is not None and flood.level(group.key[0]) != NORMAL
+    asyncio.create_task(process_message(group.message, group.content, lite=lite))
+
+async def handle_edited_message(client: Client, message):
+    content = message.text or message.caption
+    if not content: return
+    # 刷屏降级中的群不处理编辑
+    if flood is not None and flood.level(message.chat.id) != NORMAL: return
+    await process_message(message, content, edited=True)
+
+async def process_message(message, content, edited=False, lite=False):
+    """lite: 所在群处于刷屏降级状态，只做关键词匹配与推送，跳过未命中消息的记录与历史查询"""
     try:
-        content = message.text or message.caption
-        if not content: return
+        chat_id, msg_id = message.chat.id, message.id
+        digest = content_digest(content)
+        if edited:
+            # 内容未变的编辑 (表情回应等) 不重新匹配；多个监听账号收到同一次编辑时也只处理一次
+            seen = edits.check_edit(chat_id, msg_id, digest, message.edit_date is not None)
+            if seen is None: return
 
-        matched_configs = [] 
-        hit_word = ""
-        
-        for kw, users in KEYWORDS_CACHE.items():
-            if kw in content:
-                matched_configs = users
-                hit_word = kw
-                break 
-        
-        if not matched_configs: return
+        sender = message.from_user
+        verdict = None
+        if reputation is not None and sender:
+            # 只有新消息计入发言速率，编辑只沿用已有判定
+            verdict = reputation.check(sender.id) if edited else reputation.observe(sender.id, chat_id)
+        if verdict == DROP: return
+
+        # 取同一时刻的快照，避免扫描途中配置被替换
+        matcher, table = MATCHER, SUBSCRIBERS
+        # 本群没有任何可生效的订阅 (全部限定在其它群或排除了本群) 时不必扫描
+        chat_refs = message_chat_refs(message.chat)
+        if not table.chat_eligible(chat_refs): return
+        # 规范化只做一次，关键词与过滤词共用
+        normalized = NORMALIZER.normalize(content)
+        spans = {}
+        hit_keys = await matcher.scan_async(content, normalized, spans)
+        if edited:
+            # 只推送此前没有命中过的关键词
+            edits.remember(chat_id, msg_id, digest, seen.union(hit_keys))
+            hit_keys = [key for key in hit_keys if key not in seen]
+        else:
+            if hit_keys or not lite: edits.remember(chat_id, msg_id, digest, hit_keys)
+            hotwords.record({key[1] for key in hit_keys})
+        if not hit_keys: return
+        is_spam = None
+        if verdict is not None and not edited:
+            # 命中关键词的新消息都评分一次，作为发送者的广告历史
+            is_spam = spam_scorer.is_spam(content)
+            reputation.record_spam(sender.id, is_spam)
+        grouped = group_hits(hit_keys, table, chat_refs)
+
+        # 过滤词只扫描一次，得到本条消息需要排除的订阅者，直接从收件人中扣除
+        filter_index = FILTER_INDEX
+        if filter_index:
+            for uid in filter_index.owners_hit(normalized[0]): grouped.pop(uid, None)
+        # 拉黑了该发送者的订阅者同样扣除
+        if sender:
+            for uid in BLACKLIST.blockers(sender.id): grouped.pop(uid, None)
+        if not grouped: return
+        # 只有需要推送的消息才做跨进程抢占，未命中的消息不产生 Redis 请求
+        # 编辑按内容指纹区分，同一条消息的不同版本各抢占一次
+        if not await deduper.first_global(chat_id, f"{msg_id}:{digest:x}" if edited else msg_id): return
+        hit_words = list(dict.fromkeys(key[1] for key in hit_keys))
 
         chat = message.chat
-        sender = message.from_user
         source_title = chat.title or "私聊"
         msg_link = message.link if chat.username else "私有群/无链接"
         user_name = sender.first_name if sender else "未知"
         if sender and sender.last_name: user_name += f" {sender.last_name}"
         user_id = sender.id if sender else 0
         user_username = f"@{sender.username}" if sender and sender.username else "无"
-        target_username = sender.username # 用于私信
-        
-        history_tags = await get_user_history(user_id, chat.id, hit_word)
-        asyncio.create_task(save_history(user_id, chat.id, hit_word, msg_link))
+        target_username = sender.username if sender else None # 用于私信
         
-        utc_now = datetime.datetime.utcnow()
-        bj_time = utc_now + datetime.timedelta(hours=8)
-        now_str = bj_time.strftime("%Y-%m-%d %H:%M:%S")
+        history_tags = "无" if lite else await get_user_history(user_id, chat.id, hit_words)
+        asyncio.create_task(save_history(user_id, chat.id, hit_words, msg_link))
         
-        text = (
-            f"<b>监听关键词</b>\n"
-            f"🎯 <b>命中关键词：</b>#{hit_word}\n\n"
-            f"用户ID：<code>{user_id}</code>\n"
-            f"用户昵称：{user_name}\n"
-            f"用户名：{user_username}\n"
-            f"来自于：<a href='{msg_link}'>{source_title}</a>\n"
-            f"用户历史搜索：{history_tags}\n"
-            f"捕捉时间：{now_str}\n"
-            f"发送内容：{content[:200]}"
-        )
+        # 除命中词外，正文与按钮所有订阅者共用，用户字段在这里统一转义一次
+        view = RENDERER.message(user_id, user_name, user_username, source_title, msg_link, history_tags,
+                                make_snippet(content, spans), content, has_link=bool(chat.username and message.link), edited=edited)
         
-        for conf in matched_configs:
-            uid = conf['uid']
-            
+        throttled = THROTTLED
+        dup_entry = None
+        # 编辑后的新增关键词与原消息内容相近，不做近似去重
+        if neardup is not None and not edited and len(normalized[0]) >= NEARDUP_MIN_LEN:
+            dup_entry = neardup.entry_for(simhash(normalized[0]), length=len(normalized[0]))
+        for uid, (sub, user_words) in grouped.items():
             # [原有过滤逻辑]
-            if conf['paused']: continue
-            limit = conf['limit']
+            if sub.paused: continue
+            limit = sub.limit
             if limit > 0 and len(content) > limit: continue 
             
-            if uid in FILTER_CACHE:
-                has_bad_word = False
-                for bad in FILTER_CACHE[uid]:
-                    if bad in content:
-                        has_bad_word = True
-                        break
-                if has_bad_word: continue
-            
-            if conf['ai'] and is_spam_ai(content): continue
+            if sub.ai:
+                if is_spam is None: is_spam = spam_scorer.is_spam(content)
+                if is_spam: continue
 
-            # --- 推送消息 (原有逻辑) ---
-            user_kb_list = []
-            if not conf['simple']: 
-                user_kb_list = ADS_CACHE + [] 
-            
-            fixed_btns = [
-                [InlineKeyboardButton(text="🧐 消息定位 🧐", url=msg_link)] if message.link else [],
-                [InlineKeyboardButton(text="❌ 关闭", callback_data="menu_monitor"), InlineKeyboardButton(text="🔊 拉黑ID", callback_data=f"ban:{user_id}")]
-            ]
-            final_kb = InlineKeyboardMarkup(inline_keyboard=user_kb_list + fixed_btns)
-            
-            target_chat_id = conf['target'] if conf['target'] else conf['uid']
+            if dup_entry is not None:
+                if uid in dup_entry.notified: continue
+                dup_entry.notified.add(uid)
 
-            try:
-                await bot.send_message(chat_id=target_chat_id, text=text, parse_mode="HTML", reply_markup=final_kb)
-                logger.info(f"✅ 推送 -> {target_chat_id} (词:{hit_word})")
-                
-                # ==========================================
-                # 🟢 [新增] 自动私信触发逻辑
-                # ==========================================
-                if target_username: # 必须有用户名才能私信
-                    try:
-                        async with db.pg_pool.acquire() as conn:
-                            # 1. 查找该用户的私信配置 (owner_id 对应 users.id)
-                            # 联表查询: users.tg_id -> users.id -> dm_settings & dm_accounts & dm_templates
-                            dm_data = await conn.fetchrow("""
-                                SELECT s.is_auto_reply, 
-                                       (SELECT session_string FROM dm_accounts WHERE owner_id = u.id AND status='ready' ORDER BY RANDOM() LIMIT 1) as session,
-                                       (SELECT text_content FROM dm_content_templates WHERE user_id = u.id AND is_active=TRUE LIMIT 1) as content
-                                FROM users u
-                                JOIN dm_settings s ON s.user_id = u.id
-                                WHERE u.tg_id = $1
-                            """, uid)
-                        
-                        # 2. 判断是否满足发送条件
-                        if dm_data and dm_data['is_auto_reply'] and dm_data['session'] and dm_data['content']:
-                            # 异步执行，不阻塞主流程
-                            asyncio.create_task(
-                                perform_dm_task(
-                                    dm_data['session'], 
-                                    target_username, 
-                                    dm_data['content'], 
-                                    uid # owner_id (这里没用到，可用于日志)
-                                )
-                            )
-                            logger.info(f"⚖️ 触发自动私信 -> @{target_username}")
-                            
-                    except Exception as e:
-                        logger.error(f"AutoDM Check Error: {e}")
-                # ==========================================
-
-            except TelegramForbiddenError:
-                pass
-            except Exception as e:
-                logger.error(f"推送失败: {e}")
+            target_chat_id = sub.target if sub.target else sub.uid
+
+            # 发送者信誉降级，或命中的关键词全部处于限流状态时，并入摘要稍后合并推送
+            if verdict == DEMOTE or (throttled and throttled.issuperset(user_words)):
+                out = digests.add(target_chat_id, view.digest_line(user_words))
+                if out: send_digest(*out)
+                continue
+
+            # 开启了合并推送: 同一目标在窗口内的命中合并成一条，自动私信不等合并立即触发
+            if sub.digest:
+                out = user_digests.add(target_chat_id, view.digest_line(user_words), window=sub.digest)
+                if out: send_digest(*out)
+                if target_username: asyncio.create_task(auto_dm(uid, target_username))
+                continue
+
+            # 每个订阅者只推送一条，列出其命中的全部关键词；键盘按精简/普通模式共用
+            text = view.text(user_words)
+            final_kb = view.keyboard(sub.simple)
+
+            # 交给调度器按 Telegram 限速发送，匹配流程不等待网络
+            on_sent = functools.partial(after_push, uid, target_chat_id, user_words, target_username)
+            if not dispatcher.submit(target_chat_id, on_sent=on_sent, text=text, parse_mode="HTML", reply_markup=final_kb):
+                logger.warning(f"⚠️ 推送队列已满，丢弃 -> {target_chat_id}")
 
     except Exception as e:
         logger.error(f"Error: {e}")
 
+def collect_stats():
+    """worker 运行统计，定期写入 Redis 供后台查看"""
+    return {
+        "ts": int(time.time()),
+        "keywords": len(SUBSCRIBERS.keywords),
+        "subscribers": len(SUBSCRIBERS),
+        "blacklist": len(BLACKLIST),
+        "expiry_scheduled": len(EXPIRY),
+        "dedup": deduper.stats(),
+        "edits": edits.stats(),
+        "albums_merged": albums.merged,
+        "reputation": reputation.stats() if reputation else None,
+        "flood": flood.stats() if flood else None,
+        "dispatch": dispatcher.stats(),
+        "neardup": neardup.stats() if neardup else None,
+        "hotwords": hotwords.stats(),
+        "throttled": sorted(THROTTLED),
+        "digests": len(digests),
+        "user_digests": len(user_digests),
+    }
+
+async def loop_stats():
+    while True:
+        await asyncio.sleep(STATS_INTERVAL)
+        try:
+            if flood is not None:
+                flood.prune()
+                degraded = flood.degraded()
+                if degraded: logger.warning(f"🌊 刷屏降级中的群: {degraded}")
+            dispatcher.prune()
+            stats = collect_stats()
+            logger.info(f"📊 运行统计: {stats}")
+            if db.redis: await db.redis.set(f"worker:stats:{os.getpid()}", json.dumps(stats), ex=STATS_INTERVAL * 3)
+        except Exception as e:
+            logger.error(f"统计上报失败: {e}")
+
+def send_digest(target, text):
+    if not dispatcher.submit(target, text=text, parse_mode="HTML", disable_web_page_preview=True):
+        logger.warning(f"⚠️ 推送队列已满，摘要丢弃 -> {target}")
+
+async def loop_throttle():
+    """按命中率刷新限流关键词"""
+    global THROTTLED
+    while True:
+        await asyncio.sleep(THROTTLE_INTERVAL)
+        try:
+            hot = frozenset(hotwords.over_ratio(settings.HOTWORD_THROTTLE_RATIO, settings.HOTWORD_MIN_HITS))
+            if hot != THROTTLED: logger.info(f"🔥 限流关键词: {sorted(hot) or '无'}")
+            THROTTLED = hot
+        except Exception as e:
+            logger.error(f"限流刷新失败: {e}")
+
+async def loop_digests():
+    """发出到期的摘要 (高频关键词/信誉降级的摘要与订阅者的合并推送)"""
+    while True:
+        await asyncio.sleep(DIGEST_INTERVAL)
+        now = time.monotonic()
+        for buf in (digests, user_digests):
+            for target, text in buf.due(now): send_digest(target, text)
+
+def load_reports():
+    """被多个用户拉黑的发送者，作为信誉信号 (取自内存中的黑名单)"""
+    reputation.set_reports({b: len(uids) for b, uids in BLACKLIST.blocked_by.items() if len(uids) >= settings.REPUTATION_REPORTS})
+
+async def loop_reputation():
+    while True:
+        try:
+            load_reports()
+            await reputation.sync()
+        except Exception as e:
+            logger.error(f"信誉同步失败: {e}")
+        await asyncio.sleep(REPUTATION_SYNC_INTERVAL)
+
+async def loop_albums():
+    while True:
+        await asyncio.sleep(ALBUM_INTERVAL)
+        for group in albums.due(): process_album(group)
+
 async def main():
-    await load_settings()
+    global dispatcher
+    # 有可用快照时先用快照启动，数据库增量在监听账号启动后补齐
+    from_snapshot = load_snapshot()
+    if from_snapshot:
+        if not db.pg_pool: await db.connect()
+        async with db.pg_pool.acquire() as conn:
+            await load_ads(conn)
+            await load_blacklist(conn)
+    else:
+        await load_settings()
+    if settings.DEDUP_REDIS: deduper.redis = db.redis
+    if reputation is not None and settings.REPUTATION_REDIS: reputation.redis = db.redis
+    if settings.OUTBOX_ENABLED:
+        dispatcher = OutboxWriter(db.redis, settings.OUTBOX_STREAM, maxlen=settings.OUTBOX_MAXLEN)
+        logger.info(f"📮 推送写入发件箱 {settings.OUTBOX_STREAM}，由 dispatcher.py 进程发送")
+    else:
+        # 已知只接入了主机器人的目标直接走主机器人，不再先用分配到的机器人试发一次
+        dispatcher.redis = db.redis
+        try: logger.info(f"🤖 {len(dispatcher.bots)} 个推送机器人，{await dispatcher.load_pins()} 个目标固定走主机器人")
+        except Exception as e: logger.error(f"载入推送机器人分配失败: {e}")
     async with db.pg_pool.acquire() as conn:
         sessions = await conn.fetch("SELECT phone, session_string FROM worker_sessions WHERE status='online'")
     
@@ -279,22 +776,49 @@ async def main():
         try:
             c = Client(name=f"w_{s['phone']}", api_id=settings.API_ID, api_hash=settings.API_HASH, session_string=s['session_string'], in_memory=True)
             c.add_handler(MessageHandler(handle_new_message, filters.group | filters.channel))
+            c.add_handler(EditedMessageHandler(handle_edited_message, filters.group | filters.channel))
             clients.append(c)
         except Exception as e:
             logger.error(f"加载失败: {e}")
 
     if clients:
+        # 配置变更走 LISTEN/NOTIFY 增量同步，定期校验和比对兜底
+        listener = ConfigListener(apply_config_changes, on_reconnect=load_settings, on_resync=sync_deltas)
+        asyncio.create_task(listener.run())
+
+        async def sync_and_snapshot():
+            try:
+                if from_snapshot: await sync_deltas()
+                await save_snapshot()
+            except Exception as e: logger.error(f"快照同步失败: {e}")
+        asyncio.create_task(sync_and_snapshot())
+
+        async def loop_resync():
+            while True:
+                await asyncio.sleep(RESYNC_INTERVAL)
+                try: await resync_if_drifted()
+                except Exception as e: logger.error(f"配置校验失败: {e}")
+                try: await save_snapshot()
+                except Exception as e: logger.error(f"快照写入失败: {e}")
+        asyncio.create_task(loop_resync())
+        asyncio.create_task(loop_stats())
+        asyncio.create_task(loop_expiry())
+        asyncio.create_task(loop_albums())
+        asyncio.create_task(loop_digests())
+        asyncio.create_task(dispatcher.run())
+        if reputation is not None: asyncio.create_task(loop_reputation())
+        if settings.HOTWORD_THROTTLE_RATIO > 0: asyncio.create_task(loop_throttle())
+        
         logger.info(f"⚡️ 启动 {len(clients)} 个监听账号...")
         await asyncio.gather(*[c.start() for c in clients])
         
-        async def loop_reload():
-            while True:
-                await asyncio.sleep(30)
-                try: await load_settings()
-                except: pass
-        asyncio.create_task(loop_reload())
-        
         await idle()
+        await listener.close()
+        for group in albums.drain(): await process_message(group.message, group.content)
+        for buf in (digests, user_digests):
+            for target, text in buf.drain(): send_digest(target, text)
+        left = await dispatcher.drain()
+        if left: logger.warning(f"⚠️ 退出时仍有 {left} 条推送未发出")
         await asyncio.gather(*[c.stop() for c in clients])
 
 if __name__ == "__main__":